@@ -0,0 +1,66 @@
+"""
+Benchmarks for the Ewon ingestion path: syncdata parsing, TagValue parsing and frame creation.
+
+    python3 benchmarks/bench_ewon.py [-k 'ewon.*'] [--save]
+"""
+
+from datetime import timedelta
+from zoneinfo import ZoneInfo
+
+from harness import benchmark, main
+
+from data_mailbox_client import Ewon, Tag, TagValue  # noqa: E402
+from pydatamailbox.fake import generate_ewons  # noqa: E402
+
+CLOCK_TZ = ZoneInfo("Australia/Sydney")
+
+EWON_SIZES = [
+    dict(tags=10, samples=100),
+    dict(tags=100, samples=100),
+    dict(tags=100, samples=1000),
+    dict(tags=1000, samples=100),
+]
+
+
+def make_ewon_data(tags, samples):
+    """The first ewon of a syncdata response, with `samples` values for each of `tags` tags."""
+    fake = generate_ewons(tags_per_ewon=tags, interval=timedelta(minutes=1), clock_tz=CLOCK_TZ)[0]
+    return {"id": fake.id, "name": fake.name, "tags": fake.history(fake.tags, 0, samples)}
+
+
+def make_ewon():
+    ewon = Ewon(client=None, ewon_id=100000, ewon_name="ewon-000")
+    ewon.set_clock_tz(CLOCK_TZ)
+    return ewon
+
+
+@benchmark("ewon.from_json", EWON_SIZES)
+def bench_from_json(tags, samples):
+    data = make_ewon_data(tags, samples)
+    yield lambda: make_ewon().from_json(data)
+
+
+@benchmark("ewon.create_frames", EWON_SIZES)
+def bench_create_frames(tags, samples):
+    ewon = make_ewon()
+    ewon.from_json(make_ewon_data(tags, samples))
+    yield ewon.create_frames
+
+
+@benchmark("tag_value.from_json", [dict(values=1000), dict(values=10000), dict(values=100000)])
+def bench_tag_value_from_json(values):
+    history = make_ewon_data(1, values)["tags"][0]["history"]
+    tag = Tag(ewon=None, tag_id=1, tag_name="Float_0000", data_type="Float", clock_tz=CLOCK_TZ)
+    yield lambda: [TagValue(tag, data=value, clock_tz=CLOCK_TZ) for value in history]
+
+
+@benchmark("tag_value.from_column", [dict(values=1000), dict(values=10000), dict(values=100000)])
+def bench_tag_value_from_column(values):
+    ewon = make_ewon()
+    ewon.from_json(make_ewon_data(1, values))
+    tag = ewon.tags[0]
+    yield lambda: tag.values
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Benchmarks for loading Doover channel message exports.
+
+    python3 benchmarks/bench_messages.py [--save]
+"""
+
+import csv
+import json
+import os
+import tempfile
+
+from datetime import datetime, timedelta, timezone
+
+from harness import benchmark, main
+
+from pydoover.cloud.api import Message  # noqa: E402
+
+
+def write_export(path, rows):
+    """A CSV export in the format the Doover site produces, of ui_state messages with a few dozen values each."""
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Key", "Timestamp (UTC)", "Channel", "Channel ID", "Agent", "Agent ID", "Payload"])
+        for i in range(rows):
+            payload = {"state": {"children": {f"var_{n}": {"currentValue": (i * n) % 1000 / 10} for n in range(40)}}}
+            writer.writerow([
+                f"message-{i}",
+                # exports aren't necessarily in order
+                (start + timedelta(minutes=(i * 7919) % rows)).isoformat(),
+                "ui_state",
+                "channel-id",
+                "agent",
+                "agent-id",
+                json.dumps(payload),
+            ])
+
+
+@benchmark("message.from_csv_export", [dict(rows=100), dict(rows=1000), dict(rows=10000)])
+def bench_from_csv_export(rows):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "export.csv")
+        write_export(path, rows)
+        yield lambda: Message.from_csv_export(None, path)
+
+
+if __name__ == "__main__":
+    main()
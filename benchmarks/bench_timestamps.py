@@ -0,0 +1,51 @@
+"""
+Micro-benchmark: bulk Ewon history timestamp decoding vs the per-value TagValue path.
+
+    python3 benchmarks/bench_timestamps.py
+"""
+
+import os
+import sys
+import timeit
+
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "ewon_processor"))
+
+from dateutil import parser  # noqa: E402
+
+from data_mailbox_client import parse_ewon_timestamps  # noqa: E402
+
+
+def make_dates(num_tags, num_samples):
+    ## every tag in a syncdata is usually logged on the same schedule, so the timestamp strings repeat across tags
+    start = datetime(2024, 1, 1)
+    dates = [(start + timedelta(minutes=5 * i)).strftime("%Y-%m-%dT%H:%M:%SZ") for i in range(num_samples)]
+    return [list(dates) for _ in range(num_tags)]
+
+
+def per_value(histories, clock_tz):
+    ## what TagValue.from_json does for every sample
+    for dates in histories:
+        [parser.isoparse(date).replace(tzinfo=clock_tz) for date in dates]
+
+
+def bulk(histories, clock_tz):
+    cache = {}
+    for dates in histories:
+        parse_ewon_timestamps(dates, clock_tz, cache)
+
+
+def main():
+    print(f"{'tags':>6} {'samples':>8} {'clock tz':>18} {'per value (s)':>14} {'bulk (s)':>10} {'speedup':>8}")
+    for num_tags, num_samples in [(10, 100), (100, 100), (100, 1000)]:
+        histories = make_dates(num_tags, num_samples)
+        for clock_tz in [timezone.utc, ZoneInfo("Australia/Sydney")]:
+            old = min(timeit.repeat(lambda: per_value(histories, clock_tz), number=1, repeat=3))
+            new = min(timeit.repeat(lambda: bulk(histories, clock_tz), number=1, repeat=3))
+            print(f"{num_tags:>6} {num_samples:>8} {str(clock_tz):>18} {old:>14.4f} {new:>10.4f} {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
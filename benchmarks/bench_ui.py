@@ -0,0 +1,132 @@
+"""
+Benchmarks for the UI hot paths: diffing and serialising element trees, command updates, and pushing to a fake host.
+
+    python3 benchmarks/bench_ui.py [-k 'ui.*'] [--save]
+"""
+
+import itertools
+
+from harness import benchmark, main
+
+from pydoover import ui  # noqa: E402
+from pydoover.cloud.api import Client  # noqa: E402
+from pydoover.cloud.api.fake import FakeDooverServer  # noqa: E402
+
+TREE_SIZES = [dict(elements=10), dict(elements=100), dict(elements=1000), dict(elements=5000)]
+AGENT_ID = "bench-agent"
+
+
+def make_elements(elements, per_submodule=50):
+    """A UI like the Ewon processor builds: numeric and boolean variables, grouped into submodules."""
+    variables = [
+        ui.BooleanVariable(f"var_{i}", f"Variable {i}") if i % 4 == 0
+        else ui.NumericVariable(f"var_{i}", f"Variable {i}", dec_precision=2, ranges=[ui.Range("Normal", 0, 100, ui.Colour.green)])
+        for i in range(elements)
+    ]
+    return [
+        ui.Submodule(f"group_{n}", f"Group {n}", children=variables[i:i + per_submodule])
+        for n, i in enumerate(range(0, elements, per_submodule))
+    ]
+
+
+def update_values(elements, value):
+    for submodule in elements:
+        for variable in submodule.children:
+            variable.current_value = bool(value % 2) if isinstance(variable, ui.BooleanVariable) else value
+
+
+def make_container(elements):
+    children = make_elements(elements)
+    update_values(children, 1)
+    return ui.Container(name=None, children=children)
+
+
+@benchmark("ui.to_dict", TREE_SIZES)
+def bench_to_dict(elements):
+    container = make_container(elements)
+    yield container.to_dict
+
+
+@benchmark("ui.get_diff.unchanged", TREE_SIZES)
+def bench_get_diff_unchanged(elements):
+    container = make_container(elements)
+    state = container.to_dict()
+    yield lambda: container.get_diff(state)
+
+
+@benchmark("ui.get_diff.values_changed", TREE_SIZES)
+def bench_get_diff_values_changed(elements):
+    container = make_container(elements)
+    state = container.to_dict()
+    update_values(container.children, 2)
+    yield lambda: container.get_diff(state)
+
+
+@benchmark("ui.get_diff.empty_cloud", TREE_SIZES)
+def bench_get_diff_empty_cloud(elements):
+    container = make_container(elements)
+    yield lambda: container.get_diff({})
+
+
+@benchmark("ui.get_diff.one_changed_synced", TREE_SIZES)
+def bench_get_diff_one_changed_synced(elements):
+    # the tree was synced with the state after the last push, so only the changed variable is visited
+    container = make_container(elements)
+    state = container.to_dict()
+    container._mark_synced(state)
+    variable = container.children[-1].children[-1]
+    counter = itertools.count(2)
+
+    def diff():
+        variable.current_value = next(counter)
+        return container.get_diff(state)
+
+    yield diff
+
+
+@benchmark("ui.update_variable", TREE_SIZES)
+def bench_update_variable(elements):
+    # one update per variable, as on_fetch does for each frame
+    manager = ui.UIManager(agent_id=AGENT_ID)
+    manager.set_children(make_elements(elements))
+    names = [f"var_{i}" for i in range(1, elements, 4)]
+    yield lambda: [manager.update_variable(name, 1.0) for name in names]
+
+
+@benchmark("ui.get_commands_update", TREE_SIZES)
+def bench_get_commands_update(elements):
+    manager = ui.UIManager(agent_id=AGENT_ID)
+    manager.add_children(*[ui.Slider(f"slider_{i}", f"Slider {i}", current_value=i) for i in range(elements)])
+    # half the commands already match the cloud
+    manager.last_ui_cmds = {f"slider_{i}": i if i % 2 else -1 for i in range(elements)}
+    yield manager._get_commands_update
+
+
+@benchmark("ui.push", [
+    dict(elements=10, shadow_state=False),
+    dict(elements=100, shadow_state=False),
+    dict(elements=1000, shadow_state=False),
+    dict(elements=1000, shadow_state=True),
+])
+def bench_push(elements, shadow_state):
+    with FakeDooverServer() as server:
+        server.create_channel(AGENT_ID, "ui_cmds", {})
+        server.create_channel(AGENT_ID, "ui_state", {})
+
+        client = Client(token="bench", base_url=server.base_url, agent_id=AGENT_ID)
+        manager = ui.UIManager(agent_id=AGENT_ID, client=client, shadow_state=shadow_state)
+        children = make_elements(elements)
+        manager.set_children(children)
+        manager.push(even_if_empty=True)
+
+        counter = itertools.count(2)
+
+        def push():
+            update_values(children, next(counter))
+            manager.push()
+
+        yield push
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Minimal benchmark harness: parameterised cases, best-of-N timings, and JSON baselines to compare against.
+
+Benchmarks are generator functions registered with `@benchmark`. Each is called once per set of params, does its
+setup, yields the callable to time, and can clean up after the yield:
+
+    @benchmark("ewon.from_json", [dict(tags=10), dict(tags=1000)])
+    def bench_from_json(tags):
+        data = make_data(tags)
+        yield lambda: Ewon(...).from_json(data)
+"""
+
+import argparse
+import contextlib
+import fnmatch
+import io
+import json
+import os
+import platform
+import sys
+import timeit
+
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, "..", "ewon_processor"))
+
+DEFAULT_BASELINE = os.path.join(ROOT, "baselines", "baseline.json")
+
+BENCHMARKS = []
+
+
+def benchmark(name, params):
+    def decorator(setup):
+        BENCHMARKS.append((name, params, contextlib.contextmanager(setup)))
+        return setup
+    return decorator
+
+
+def params_label(params):
+    return ",".join(f"{k}={v}" for k, v in params.items())
+
+
+def run(pattern="*", repeat=5, number=1):
+    """Run every matching benchmark, yielding (name, params label, best seconds per call) as each finishes."""
+    for name, param_sets, setup in BENCHMARKS:
+        if not fnmatch.fnmatch(name, pattern):
+            continue
+        for params in param_sets:
+            # the code under test is quite chatty, which would swamp the output and skew the timings
+            with contextlib.redirect_stdout(io.StringIO()):
+                with setup(**params) as func:
+                    func()  # warm up
+                    best = min(timeit.repeat(func, number=number, repeat=repeat)) / number
+            yield name, params_label(params), best
+
+
+def report(results, baseline=None):
+    """Print each result alongside its baseline as it arrives, returning them all."""
+    baseline = (baseline or {}).get("results", {})
+    print(f"{'benchmark':<32} {'params':<36} {'best (ms)':>11} {'baseline':>11} {'change':>8}")
+    rows = []
+    for name, label, best in results:
+        rows.append((name, label, best))
+        line = f"{name:<32} {label:<36} {best * 1000:>11.3f}"
+        previous = baseline.get(name, {}).get(label)
+        if previous:
+            line += f" {previous * 1000:>11.3f} {best / previous:>7.2f}x"
+        print(line, flush=True)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run benchmarks and compare them against a stored baseline.")
+    parser.add_argument("-k", "--filter", default="*", help="Only run benchmarks matching this glob, eg. 'ui.*'")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="Number of timing runs; the best is reported")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline file to compare against")
+    parser.add_argument("--save", action="store_true", help="Merge these results into the baseline file")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = report(run(args.filter, args.repeat), baseline)
+
+    if args.save:
+        saved = baseline or {"results": {}}
+        for name, label, best in results:
+            saved["results"].setdefault(name, {})[label] = best
+        saved["python"] = platform.python_version()
+        saved["machine"] = platform.machine()
+        saved["saved_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(saved, f, indent=2, sort_keys=True)
+        print(f"Saved {len(results)} results to {args.baseline}")
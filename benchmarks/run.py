@@ -0,0 +1,16 @@
+"""
+Run the whole benchmark suite, comparing against (and optionally updating) the stored baseline.
+
+    python3 benchmarks/run.py                 # compare against benchmarks/baselines/baseline.json
+    python3 benchmarks/run.py -k 'ui.*'       # only the UI benchmarks
+    python3 benchmarks/run.py --save          # record the current results as the new baseline
+"""
+
+import bench_ewon  # noqa: F401
+import bench_messages  # noqa: F401
+import bench_ui  # noqa: F401
+
+from harness import main
+
+if __name__ == "__main__":
+    main()
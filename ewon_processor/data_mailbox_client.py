@@ -2,16 +2,25 @@
 
 from pydatamailbox import (
     DataMailbox,
+    TokenBucket,
     # DataMailboxArgsError,
     # DataMailboxBaseException,
     # M2Web,
 )
 
-from typing import Any, Union, Callable, overload, Literal, Optional, TypeVar, List
-from datetime import datetime, timezone
+from typing import Any, Union, Callable, overload, Literal, Optional, TypeVar, List, Iterable
+from datetime import datetime, timezone, timedelta, tzinfo
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dateutil import parser, tz
+from array import array
+import hashlib
 import json
+import logging
+import os
+import time
+import requests
 
+log = logging.getLogger(__name__)
 
 
 def time_to_iso_string(time: Union[datetime, int, str]) -> str:
@@ -31,29 +40,140 @@ def time_to_iso_string(time: Union[datetime, int, str]) -> str:
 
 
 
+_EPOCH = datetime(1970, 1, 1)
+
+
+def parse_ewon_timestamps(dates: Iterable[str], clock_tz: Optional[tzinfo] = None, cache: Optional[dict] = None) -> List[int]:
+    """Decode a batch of Ewon history date strings into epoch milliseconds.
+
+    The wall-clock time in each string is interpreted in the Ewon's clock timezone (any offset in the string is ignored).
+    Repeated strings are only parsed once - pass the same `cache` dict across tags to share this across a whole syncdata.
+    """
+    clock_tz = clock_tz or timezone.utc
+    if cache is None:
+        cache = {}
+
+    ## fixed offset timezones can be applied with a single subtraction, rather than per value
+    fixed_offset = clock_tz.utcoffset(None).total_seconds() if isinstance(clock_tz, timezone) else None
+
+    result = []
+    for date in dates:
+        timestamp = cache.get(date)
+        if timestamp is None:
+            try:
+                naive = datetime.fromisoformat(date).replace(tzinfo=None)
+            except ValueError:
+                naive = parser.isoparse(date).replace(tzinfo=None)
+
+            if fixed_offset is not None:
+                timestamp = round(((naive - _EPOCH).total_seconds() - fixed_offset) * 1000)
+            else:
+                timestamp = round(naive.replace(tzinfo=clock_tz).timestamp() * 1000)
+            cache[date] = timestamp
+        result.append(timestamp)
+
+    return result
+
+
+DEFAULT_METADATA_CACHE_DIR = "/tmp/ewon_metadata_cache"
+
+
 class DataMailboxClient:
 
-    def __init__(self, token: str, devid: str = None, account: str = None):
+    def __init__(self,
+            token: str,
+            devid: str = None,
+            account: str = None,
+            metadata_cache_ttl: Optional[int] = None,
+            metadata_cache_dir: str = DEFAULT_METADATA_CACHE_DIR,
+            rate_limiter: Optional[TokenBucket] = None,
+            base_url: Optional[str] = None,
+            session: Optional[requests.Session] = None,
+        ):
         self.token = token
         self.devid = devid
         self.account = account
 
+        ## getewon / getewons results are cached on disk for this many seconds (None disables caching),
+        ## so warm containers can skip the round-trip for metadata that rarely changes
+        self.metadata_cache_ttl = metadata_cache_ttl
+        self.metadata_cache_dir = metadata_cache_dir
+
+        ## shared with every other client on the same account, see `TokenBucket.for_account`
+        self.rate_limiter = rate_limiter
+        self.base_url = base_url
+        self.session = session
+
         self._dm = None
 
+        ## account-wide sync state, shared by every ewon synced through `sync_ewons`
+        self.ewons = {} # Dict[str, Ewon], keyed by str(ewon_id)
+        self.last_transaction_id = None
+        self.more_data_available = False
+
         self.setup()
 
     def setup(self):
-        self._dm = DataMailbox(token=self.token, devid=self.devid, account=self.account)
+        self._dm = DataMailbox(token=self.token, devid=self.devid, account=self.account, rate_limiter=self.rate_limiter, base_url=self.base_url, session=self.session)
         self._dm.data.pop("t2maccount", None)
 
     def getstatus(self):
         return self._dm.getstatus()
 
     def getewons(self):
-        return self._dm.getewons()
+        return self._cached_metadata("getewons", self._dm.getewons)
 
     def getewon(self, ewon_id: int, ewon_name: str = None):
-        return self._dm.getewon(ewon_id, ewon_name)
+        return self._cached_metadata(f"getewon-{ewon_id}-{ewon_name}", self._dm.getewon, ewon_id, ewon_name)
+
+    def _metadata_cache_prefix(self):
+        ## don't leak the token into file names
+        return hashlib.sha256(f"{self.devid}:{self.token}".encode()).hexdigest()[:16]
+
+    def _metadata_cache_path(self, key: str):
+        safe_key = "".join(c if c.isalnum() or c in "-_" else "_" for c in key)
+        return os.path.join(self.metadata_cache_dir, f"{self._metadata_cache_prefix()}-{safe_key}.json")
+
+    def _cached_metadata(self, key: str, func: Callable, *args):
+        if not self.metadata_cache_ttl:
+            return func(*args)
+
+        path = self._metadata_cache_path(key)
+        try:
+            with open(path, "r") as f:
+                cached = json.load(f)
+            if time.time() - cached["cached_at"] < self.metadata_cache_ttl:
+                return cached["data"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+        data = func(*args)
+
+        try:
+            os.makedirs(self.metadata_cache_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"cached_at": time.time(), "data": data}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            log.warning("Failed to write ewon metadata cache: %s", e)
+
+        return data
+
+    def invalidate_metadata_cache(self):
+        ## drop all cached getewon / getewons results for this account, eg. when an ewon's tag set has changed
+        prefix = self._metadata_cache_prefix()
+        try:
+            names = os.listdir(self.metadata_cache_dir)
+        except OSError:
+            return
+
+        for name in names:
+            if name.startswith(prefix):
+                try:
+                    os.remove(os.path.join(self.metadata_cache_dir, name))
+                except OSError:
+                    pass
 
     def getdata(self, ewon_id: int, tag_id: int, start: Union[str, int, datetime], end: Union[str, int, datetime], limit: int):
         from_ts = time_to_iso_string(start)
@@ -63,8 +183,76 @@ class DataMailboxClient:
     def syncdata(self, last_transaction_id=None, create_transaction=True, ewon_ids=None):
         return self._dm.syncdata(last_transaction_id, create_transaction, ewon_ids)
     
-    def iterate_syncdata(self, last_transaction_id=None, ewon_ids=None):
-        return self._dm.iterate_syncdata(last_transaction_id, ewon_ids)
+    def iterate_syncdata(self, last_transaction_id=None, ewon_ids=None, stream=False):
+        return self._dm.iterate_syncdata(last_transaction_id, ewon_ids, stream)
+
+    def syncdata_stream(self, last_transaction_id=None, create_transaction=True, ewon_ids=None):
+        return self._dm.syncdata_stream(last_transaction_id, create_transaction, ewon_ids)
+
+    def get_ewon(self, ewon_id: int, ewon_name: Optional[str] = None):
+        ## Get (or register) an ewon for account-wide syncing.
+        ## Register ewons up front to set their clock timezone, otherwise they're created as they appear in syncdata.
+        key = str(ewon_id)
+        if key not in self.ewons:
+            self.ewons[key] = Ewon(client=self, ewon_id=ewon_id, ewon_name=ewon_name, last_transaction_id=self.last_transaction_id)
+        return self.ewons[key]
+
+    def sync_ewons(self, create_transaction: Optional[bool] = None, stream: bool = False):
+        ## Run a single syncdata for every ewon on the account, rather than one per ewon,
+        ## and split the response out into each ewon. Returns the ewons that had new data.
+        if self.last_transaction_id is None and create_transaction is None:
+            create_transaction = True
+        else:
+            create_transaction = create_transaction or False
+
+        if stream:
+            page = self.syncdata_stream(last_transaction_id=self.last_transaction_id, create_transaction=create_transaction)
+        else:
+            page = self.syncdata(last_transaction_id=self.last_transaction_id, create_transaction=create_transaction)
+        return self._load_ewons_page(page)
+
+    def iterate_sync_ewons(self, stream: bool = False):
+        ## Same as sync_ewons, but iterates through every page until there's no more data available
+        for page in self.iterate_syncdata(last_transaction_id=self.last_transaction_id, stream=stream):
+            yield self._load_ewons_page(page)
+
+    def _load_ewons_page(self, page):
+        updated = {}
+
+        if isinstance(page, dict):
+            for ewon_data in page.get("ewons") or []:
+                ewon = self.get_ewon(ewon_data.get("id"), ewon_data.get("name"))
+                ewon.clear_tag_values()
+                ewon.from_json(ewon_data)
+                updated[str(ewon.ewon_id)] = ewon
+            transaction_id = page.get("transactionId")
+            more_data_available = bool(page.get("moreDataAvailable"))
+        else:
+            ## a SyncdataStream, where each ewon's tags arrive one at a time
+            timestamp_caches = {}
+            for ewon_data, tag_data in page:
+                ewon = self.get_ewon(ewon_data.get("id"), ewon_data.get("name"))
+                key = str(ewon.ewon_id)
+                if key not in updated:
+                    ewon.tags = []
+                    ewon.tag_frames = []
+                    updated[key] = ewon
+                    timestamp_caches[key] = {}
+                ewon.tags.append(Tag(ewon=ewon, data=tag_data, clock_tz=ewon.clock_tz, timestamp_cache=timestamp_caches[key]))
+            transaction_id = page.transaction_id
+            more_data_available = page.more_data_available
+
+        for key, ewon in self.ewons.items():
+            if key in updated:
+                ewon._check_tag_set()
+            else:
+                ewon.clear_tag_values()
+            ewon.last_transaction_id = transaction_id
+            ewon.more_data_available = more_data_available
+
+        self.last_transaction_id = transaction_id
+        self.more_data_available = more_data_available
+        return list(updated.values())
 
 
 class Ewon:
@@ -77,18 +265,118 @@ class Ewon:
         self.clock_tz = timezone.utc
 
         self.last_transaction_id = last_transaction_id
+        self.more_data_available = False
         self.tags = [] # List[Tag]
+        self._known_tag_ids = set() # tag ids from the last getewon, to spot changes to the tag set
         self.tag_frames = [] # List[TagFrame]
 
     def set_clock_tz(self, tz: Union[str, timezone]):
         if isinstance(tz, str):
             tz = timezone(tz)
-        print(f"Setting clock timezone to {tz}")
+        log.info("Setting clock timezone to %s", tz)
         self.clock_tz = tz
 
     def update(self):
         ewon_data = self.client.getewon(self.ewon_id, self.ewon_name)
         self.from_json(ewon_data)
+        self._known_tag_ids = {tag.tag_id for tag in self.tags}
+
+    def _check_tag_set(self):
+        ## if synced data has tags we didn't know about, any cached metadata for this ewon is out of date
+        if not self._known_tag_ids:
+            return
+        new_ids = {tag.tag_id for tag in self.tags} - self._known_tag_ids
+        if new_ids and hasattr(self.client, "invalidate_metadata_cache"):
+            log.info("Ewon %s has new tags %s, invalidating metadata cache", self.ewon_id, sorted(new_ids))
+            self.client.invalidate_metadata_cache()
+            self._known_tag_ids |= new_ids
+
+    def backfill(self,
+            start: datetime,
+            end: datetime,
+            window: timedelta = timedelta(days=1),
+            max_workers: int = 4,
+            tag_names: Optional[List[str]] = None,
+            limit: Optional[int] = None,
+        ):
+        ## Re-seed tag history between start and end using getdata.
+        ## The range is split into windows for each tag, which are fetched concurrently by a bounded pool of workers,
+        ## then merged in timestamp order into each tag's history.
+        if self.tags.__len__() == 0:
+            self.update()
+
+        if tag_names is None:
+            tags = self.tags
+        else:
+            tags = [tag for tag in (self.get_tag(name) for name in tag_names) if tag is not None]
+
+        windows = []
+        window_start = start
+        while window_start < end:
+            windows.append((window_start, min(window_start + window, end)))
+            window_start += window
+
+        histories = {tag.tag_id: [] for tag in tags}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self._fetch_history_window, tag, window_start, window_end, limit): tag
+                for tag in tags for window_start, window_end in windows
+            }
+            for future in as_completed(futures):
+                histories[futures[future].tag_id].extend(future.result())
+
+        timestamp_cache = {}
+        for tag in tags:
+            history = histories[tag.tag_id]
+            timestamps = parse_ewon_timestamps([value.get("date") for value in history], self.clock_tz, timestamp_cache)
+            tag.merge_values(timestamps, [value.get("value") for value in history])
+
+        return self
+
+    def _to_clock_string(self, time: datetime):
+        ## the DataMailbox stores the ewon's clock time (labelled as UTC), so query it in the same terms
+        if time.tzinfo is not None:
+            time = time.astimezone(self.clock_tz).replace(tzinfo=None)
+        return time.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    def _fetch_history_window(self, tag, start: datetime, end: datetime, limit: Optional[int] = None):
+        ## fetch one tag's history for one window, following moreDataAvailable until the window is exhausted
+        history = []
+        boundary = set()
+        from_ts = self._to_clock_string(start)
+        to_ts = self._to_clock_string(end)
+
+        while True:
+            data = self.client.getdata(self.ewon_id, tag.tag_id, from_ts, to_ts, limit)
+
+            page = []
+            received = 0
+            for ewon_data in data.get("ewons") or []:
+                for tag_data in ewon_data.get("tags") or []:
+                    for value in tag_data.get("history") or []:
+                        received += 1
+                        ## the next page starts from the last date we saw, so skip anything already seen on that date
+                        if (value.get("date"), repr(value.get("value"))) not in boundary:
+                            page.append(value)
+
+            history.extend(page)
+            if not data.get("moreDataAvailable") or not received:
+                return history
+
+            if not page:
+                ## getdata has no continuation token, and this whole page was on the date the last one ended on,
+                ## so asking from that date again would only return the same values. Skip past it rather than
+                ## stopping here and losing the rest of the window.
+                log.warning(
+                    "More than %s values for tag %s at %s, some values at that time may be missing",
+                    received, tag.tag_name, from_ts,
+                )
+                from_ts = (parser.isoparse(from_ts).replace(tzinfo=None) + timedelta(seconds=1)).strftime("%Y-%m-%dT%H:%M:%SZ")
+                boundary = set()
+                continue
+
+            from_ts = page[-1].get("date")
+            boundary = {(value.get("date"), repr(value.get("value"))) for value in page if value.get("date") == from_ts}
 
     def get_tag(self, tag_name: Optional[str] = None, tag_id: Optional[int] = None):
         if tag_name:
@@ -106,22 +394,31 @@ class Ewon:
     def create_frames(self):
         if self.tags.__len__() == 0:
             self.update()
-        
-        for tag in self.tags:
-            for value in tag.values:
-                frame = None
-                for f in self.tag_frames:
-                    if f.tag_ts_matches(value):
-                        frame = f
-                        break
-                if frame is None:
-                    print(f"Creating new frame for {value}, with timestamp {value.timestamp}")
-                    frame = TagFrame(ewon=self, timestamp=value.timestamp, tag_values=[value])
-                else:
-                    frame.add_tag_value(value)
 
-                if frame not in self.tag_frames:
-                    self.tag_frames.append(frame)
+        ## Sort every value by timestamp, then sweep through them in order,
+        ## starting a new frame whenever a value falls outside the current frame's window.
+        ## This works on the tags' timestamp columns, and only creates a TagValue for each value as it's framed.
+        keys = sorted(
+            (timestamp, tag_index, value_index)
+            for tag_index, tag in enumerate(self.tags)
+            for value_index, timestamp in enumerate(tag.timestamps)
+        )
+        window_ms = TagFrame.window_secs * 1000
+
+        self.tag_frames = []
+        frame = None
+        frame_start = None
+        for timestamp, tag_index, value_index in keys:
+            value = self.tags[tag_index].get_value(value_index)
+            if frame is None or timestamp - frame_start >= window_ms:
+                log.debug("Creating new frame for %s, with timestamp %s", value, value.timestamp)
+                frame = TagFrame(ewon=self, timestamp=value.timestamp, tag_values=[value])
+                frame_start = timestamp
+                self.tag_frames.append(frame)
+            else:
+                frame.add_tag_value(value)
+
+        return self.tag_frames
 
     def pretty_print(self, verbose: bool = False):
         print(f"Ewon: {self.ewon_name} ({self.ewon_id})")
@@ -132,7 +429,16 @@ class Ewon:
             for f in self.tag_frames:
                 print(f)
 
-    def syncdata(self, create_transaction: Optional[bool] = None):
+    def syncdata(self, create_transaction: Optional[bool] = None, stream: bool = False):
+
+        if stream:
+            tags = list(self.iter_syncdata(create_transaction))
+            if tags:
+                self.tags = tags
+                self._check_tag_set()
+                return self
+            self.clear_tag_values()
+            return None
 
         if self.last_transaction_id is None and create_transaction is None:
             create_transaction = True
@@ -140,8 +446,11 @@ class Ewon:
             create_transaction = create_transaction or False
 
         data = self.client.syncdata(last_transaction_id=self.last_transaction_id, create_transaction=create_transaction, ewon_ids=[self.ewon_id])
-        
+        return self._from_syncdata(data)
+
+    def _from_syncdata(self, data: dict):
         self.last_transaction_id = data.get("transactionId")
+        self.more_data_available = bool(data.get("moreDataAvailable"))
 
         ## get the ewon data
         ewons = data.get("ewons")
@@ -151,8 +460,52 @@ class Ewon:
 
             return self
 
+        ## nothing new for this ewon, so make sure we don't hang on to values from a previous sync
+        self.clear_tag_values()
         return None
 
+    def iterate_syncdata(self, stream: bool = False):
+        ## Iterate through every page of syncdata until there's no more data available,
+        ## yielding this ewon with each page's tags loaded. Nothing is held over between pages.
+        pages = self.client.iterate_syncdata(last_transaction_id=self.last_transaction_id, ewon_ids=[self.ewon_id], stream=stream)
+        for page in pages:
+            if stream:
+                tags = list(self._tags_from_stream(page))
+                if tags:
+                    self.tags = tags
+                    self._check_tag_set()
+                else:
+                    self.clear_tag_values()
+            else:
+                self._from_syncdata(page)
+            yield self
+
+    def clear_tag_values(self):
+        for tag in self.tags:
+            tag.clear_values()
+        self.tag_frames = []
+
+    def iter_syncdata(self, create_transaction: Optional[bool] = None):
+        ## Stream syncdata for this ewon, yielding each Tag as soon as its history has been read.
+        ## Neither the raw response nor the tags are kept, so memory is bounded by the largest single tag.
+        if self.last_transaction_id is None and create_transaction is None:
+            create_transaction = True
+        else:
+            create_transaction = create_transaction or False
+
+        stream = self.client.syncdata_stream(last_transaction_id=self.last_transaction_id, create_transaction=create_transaction, ewon_ids=[self.ewon_id])
+        yield from self._tags_from_stream(stream)
+
+    def _tags_from_stream(self, stream):
+        timestamp_cache = {}
+        for ewon_data, tag_data in stream:
+            self.ewon_id = ewon_data.get("id", self.ewon_id)
+            self.ewon_name = ewon_data.get("name", self.ewon_name)
+            yield Tag(ewon=self, data=tag_data, clock_tz=self.clock_tz, timestamp_cache=timestamp_cache)
+
+        self.last_transaction_id = stream.transaction_id
+        self.more_data_available = stream.more_data_available
+
     def from_json(self, data: dict):
         self.json_data = data
 
@@ -161,11 +514,18 @@ class Ewon:
 
         tags = data.get("tags")
         if tags:
-            self.tags = [Tag(ewon=self, data=tag, clock_tz=self.clock_tz) for tag in tags]
+            ## tags in the same syncdata mostly share timestamps, so only parse each one once
+            timestamp_cache = {}
+            self.tags = [Tag(ewon=self, data=tag, clock_tz=self.clock_tz, timestamp_cache=timestamp_cache) for tag in tags]
+            self._check_tag_set()
 
 
 class Tag:
 
+    ## array typecode for the values of each data type, so integer tags keep int values.
+    ## Values of any other type (eg. String) are kept in a plain list.
+    VALUE_TYPECODES = {"Bool": "b", "Int": "q", "DWord": "q", "Float": "d"}
+
     def __init__(self, 
                 ewon: Ewon,
                 tag_id: Optional[int] = None,
@@ -174,6 +534,7 @@ class Tag:
                 description: Optional[str] = None,
                 data: Optional[dict] = None,
                 clock_tz: Optional[timezone] = None,
+                timestamp_cache: Optional[dict] = None,
             ):
         self.ewon = ewon
         
@@ -184,12 +545,83 @@ class Tag:
         
         self.clock_tz = clock_tz
 
-        self.values = [] # List[TagValue]
+        ## History is stored as columns rather than a list of TagValue objects:
+        ## epoch milliseconds, and values in an array typed by the tag's data type (see VALUE_TYPECODES).
+        ## TagValue views are only created on demand.
+        self.timestamps = array("q")
+        self.value_array = self._new_value_array()
 
         if data:
-            self.from_json(data)
+            self.from_json(data, timestamp_cache=timestamp_cache)
+
+    def _new_value_array(self):
+        typecode = self.VALUE_TYPECODES.get(self.tag_data_type)
+        if typecode is None:
+            return []
+        return array(typecode)
+
+    def clear_values(self):
+        self.timestamps = array("q")
+        self.value_array = self._new_value_array()
+
+    def add_value(self, timestamp: datetime, value: Any):
+        if self.tag_data_type == "Bool":
+            value = value in [1, "1", "True", "true"]
+
+        try:
+            self.value_array.append(value)
+        except TypeError:
+            ## not a number, so fall back to storing values as plain python objects
+            if isinstance(self.value_array, array):
+                self.value_array = self.value_array.tolist()
+            self.value_array.append(value)
+
+        self.timestamps.append(round(timestamp.timestamp() * 1000))
+
+    def extend_values(self, timestamps: Iterable[int], values: Iterable[Any]):
+        ## bulk version of add_value, taking timestamps as epoch milliseconds
+        if self.tag_data_type == "Bool":
+            values = [value in [1, "1", "True", "true"] for value in values]
+        else:
+            values = list(values)
 
-    def from_json(self, data: dict):
+        try:
+            self.value_array.extend(values)
+        except TypeError:
+            ## the array may have been partly extended before hitting a non-number, so drop those before falling back
+            if isinstance(self.value_array, array):
+                self.value_array = self.value_array[:len(self.timestamps)].tolist()
+            self.value_array.extend(values)
+
+        self.timestamps.extend(timestamps)
+
+    def merge_values(self, timestamps: Iterable[int], values: Iterable[Any]):
+        ## merge new values (with timestamps as epoch milliseconds) into the existing history,
+        ## keeping it in timestamp order and dropping exact duplicates
+        if self.tag_data_type == "Bool":
+            values = [value in [1, "1", "True", "true"] for value in values]
+
+        merged = list(zip(self.timestamps, self.value_array))
+        merged.extend(zip(timestamps, values))
+        merged = sorted(dict.fromkeys(merged), key=lambda p: p[0])
+
+        self.clear_values()
+        self.extend_values([p[0] for p in merged], [p[1] for p in merged])
+
+    def get_value(self, index: int):
+        return TagValue.from_column(self, self.timestamps[index], self.value_array[index])
+
+    @property
+    def values(self):
+        return [self.get_value(i) for i in range(len(self.timestamps))]
+
+    @values.setter
+    def values(self, values):
+        self.clear_values()
+        for value in values:
+            self.add_value(value.timestamp, value.value)
+
+    def from_json(self, data: dict, timestamp_cache: Optional[dict] = None):
         self.tag_id = data.get("id")
         self.tag_name = data.get("name")
         self.tag_data_type = data.get("dataType")
@@ -199,8 +631,12 @@ class Tag:
             self.description = self.description.rstrip()
 
         history = data.get("history")
+        if history or not self.timestamps:
+            ## (re)create the columns, since the value array type depends on the data type
+            self.clear_values()
         if history:
-            self.values = [TagValue(tag=self, data=tag, clock_tz=self.clock_tz) for tag in history]
+            timestamps = parse_ewon_timestamps([value.get("date") for value in history], self.clock_tz, timestamp_cache)
+            self.extend_values(timestamps, [value.get("value") for value in history])
 
     def pretty_print(self, verbose: bool = False):
         print(f"Tag: {self.tag_name} ({self.tag_id})")
@@ -212,7 +648,7 @@ class Tag:
                 print(value)
 
     def get_num_values(self):
-        return self.values.__len__()
+        return self.timestamps.__len__()
 
     def __repr__(self):
         return f"Tag(tag_id={self.tag_id}, tag_name={self.tag_name}, history_count={self.get_num_values()} data_type={self.tag_data_type}, description={self.description})"
@@ -220,6 +656,8 @@ class Tag:
 
 class TagValue:
 
+    __slots__ = ("tag", "value", "timestamp", "clock_tz")
+
     def __init__(self, tag: Tag, data: Optional[dict] = None, clock_tz: Optional[timezone] = None):
         self.tag = tag
 
@@ -242,6 +680,15 @@ class TagValue:
 
         self.timestamp = self.timestamp.replace(tzinfo=self.clock_tz)
 
+    @classmethod
+    def from_column(cls, tag: Tag, timestamp_ms: int, value: Any):
+        tag_value = cls(tag=tag, clock_tz=tag.clock_tz)
+        tag_value.timestamp = datetime.fromtimestamp(timestamp_ms / 1000, tz=tag.clock_tz or timezone.utc)
+        if tag.tag_data_type == "Bool":
+            value = bool(value)
+        tag_value.value = value
+        return tag_value
+
     @property
     def tag_name(self):
         return self.tag.tag_name
@@ -252,6 +699,9 @@ class TagValue:
 
 class TagFrame:
 
+    ## values within this many seconds of the frame's timestamp belong to the same frame
+    window_secs = 5 * 60
+
     def __init__(self, ewon: Ewon, timestamp: datetime, tag_values: List[TagValue]):
         self.ewon = ewon
 
@@ -260,16 +710,15 @@ class TagFrame:
 
     def tag_ts_matches(self, tag_value: TagValue):
         ## if timestamp is equal, or within 5 mins
-        within_mins = 5
-
         if self.timestamp == tag_value.timestamp:
             return True
-        elif abs((self.timestamp - tag_value.timestamp).total_seconds()) < (within_mins*60):
+        elif abs((self.timestamp - tag_value.timestamp).total_seconds()) < self.window_secs:
             return True
         return False
     
     def add_tag_value(self, tag_value: TagValue):
-        self.tag_values.insert(0, tag_value)
+        ## values are added in chronological order, so the latest value for a tag is applied last
+        self.tag_values.append(tag_value)
 
     def __repr__(self):
         value_string = ", ".join([f"{tag_val.tag.tag_name}={tag_val.value}" for tag_val in self.tag_values])
@@ -1,2 +1,5 @@
 from .client import *  # NOQA
+from .async_client import *  # NOQA
 from .exceptions import *  # NOQA
+from .ratelimit import *  # NOQA
+from .stream import *  # NOQA
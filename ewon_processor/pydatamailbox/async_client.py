@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+from requests.adapters import HTTPAdapter
+
+from pydatamailbox.client import DataMailbox
+
+__all__ = ("AsyncDataMailbox",)
+
+
+def _without_rate_limit(dm, func):
+    """
+    Wraps a DataMailbox method so its request doesn't take a second token, when one was already acquired async.
+    """
+    def inner(*args, **kwargs):
+        dm._skip_rate_limit.active = True
+        try:
+            return func(*args, **kwargs)
+        finally:
+            dm._skip_rate_limit.active = False
+
+    return inner
+
+
+class AsyncDataMailbox(object):
+    """
+    asyncio version of :class:`DataMailbox`, with the same methods as coroutines.
+
+    Requests are run on worker threads through a shared session, with at most ``max_concurrency`` in flight at once,
+    so many Ewons (or many ``getdata`` windows) can be fetched concurrently from one event loop.
+    Errors are raised as the same exceptions as :class:`DataMailbox`.
+    """
+
+    def __init__(
+        self, account, devid, timeout=None, max_concurrency=10, rate_limiter=None, **kwargs
+    ):
+        self._dm = DataMailbox(account, devid, timeout, rate_limiter, **kwargs)
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+        # make sure the connection pool is big enough that concurrent requests don't throw away connections
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self._dm.session.mount("https://", adapter)
+        self._dm.session.mount("http://", adapter)
+
+    @property
+    def data(self):
+        return self._dm.data
+
+    @property
+    def session(self):
+        return self._dm.session
+
+    def __str__(self):
+        return str(self._dm)
+
+    @property
+    def rate_limiter(self):
+        return self._dm.rate_limiter
+
+    async def _run(self, func, *args, **kwargs):
+        async with self._semaphore:
+            if self.rate_limiter is not None:
+                # wait for a token here rather than tying up a worker thread
+                await self.rate_limiter.acquire_async()
+                func = _without_rate_limit(self._dm, func)
+            return await asyncio.to_thread(func, *args, **kwargs)
+
+    async def getstatus(self):
+        """
+        See :meth:`DataMailbox.getstatus`.
+        """
+        return await self._run(self._dm.getstatus)
+
+    async def getewons(self):
+        """
+        See :meth:`DataMailbox.getewons`.
+        """
+        return await self._run(self._dm.getewons)
+
+    async def getewon(self, ewonid=None, name=None):
+        """
+        See :meth:`DataMailbox.getewon`.
+        """
+        return await self._run(self._dm.getewon, ewonid, name)
+
+    async def syncdata(
+        self, last_transaction_id=None, create_transaction=True, ewon_ids=None
+    ):
+        """
+        See :meth:`DataMailbox.syncdata`.
+        """
+        return await self._run(
+            self._dm.syncdata, last_transaction_id, create_transaction, ewon_ids
+        )
+
+    async def getdata(self, ewon_id, tag_id, from_ts, to_ts, limit=None):
+        """
+        See :meth:`DataMailbox.getdata`.
+        """
+        return await self._run(
+            self._dm.getdata, ewon_id, tag_id, from_ts, to_ts, limit
+        )
+
+    async def iterate_syncdata(self, last_transaction_id=None, ewon_ids=None):
+        """
+        Async iterator on syncdata. See :meth:`DataMailbox.iterate_syncdata`.
+        """
+        while True:
+            ret = await self.syncdata(last_transaction_id, ewon_ids=ewon_ids)
+            yield ret
+            if not ret.get("moreDataAvailable"):
+                break
+            last_transaction_id = ret["transactionId"]
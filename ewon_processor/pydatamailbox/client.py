@@ -1,6 +1,10 @@
 # -*- coding: utf-8 -*-
 
 import json
+import logging
+import threading
+import time
+
 import requests
 
 from pydatamailbox.exceptions import (
@@ -9,17 +13,31 @@ from pydatamailbox.exceptions import (
     DataMailboxResponseError,
     DataMailboxStatusError,
 )
+from pydatamailbox.stream import SyncdataStream
 
 __all__ = ("DataMailbox", "M2Web")
 
+log = logging.getLogger(__name__)
+
 
 class EwonClient(object):
-    def __init__(self, base_url, account, data=None, timeout=None):
+    def __init__(
+        self, base_url, account, data=None, timeout=None, rate_limiter=None, session=None
+    ):
         self.account = account
         self.timeout = timeout
         self.data = data
         self.base_url = base_url
-        self.session = requests.Session()
+        # optional limiter (eg. a TokenBucket) that every request must acquire from before it's sent
+        self.rate_limiter = rate_limiter
+        # set by callers that have already acquired a token for the request (eg. AsyncDataMailbox)
+        self._skip_rate_limit = threading.local()
+        # called with a dict describing each request (method, route, status, latency, bytes...), before it's sent
+        # and once it's finished. Any callable works, eg. ``pydoover.cloud.api.metrics.RequestMetrics``.
+        self.before_request_hooks = []
+        self.after_request_hooks = []
+        # pass in a session to reuse its connections between clients
+        self.session = session or requests.Session()
         self.session.headers.update(
             {"Content-Type": "application/x-www-form-urlencoded"}
         )
@@ -30,9 +48,55 @@ class EwonClient(object):
     def _build_url(self, url):
         return self.base_url + url
 
+    def _acquire_rate_limit(self):
+        if self.rate_limiter is None or getattr(self._skip_rate_limit, "active", False):
+            return
+        self.rate_limiter.acquire()
+
+    def _run_hooks(self, hooks, event):
+        for hook in hooks:
+            try:
+                hook(event)
+            except Exception as e:
+                log.warning("Request hook %s failed: %s", hook, e)
+
+    def _post(self, url, data, stream=False):
+        """
+        Sends the request, running the before and after request hooks around it.
+        """
+        event = {
+            "client": self.__class__.__name__,
+            "method": "POST",
+            "route": url[len(self.base_url):] if url.startswith(self.base_url) else url,
+            "url": url,
+        }
+        self._run_hooks(self.before_request_hooks, event)
+        started = time.perf_counter()
+        response = None
+        try:
+            response = self.session.post(url=url, data=data, timeout=self.timeout, stream=stream)
+            return response
+        finally:
+            if response is None:
+                response_bytes = 0
+            elif stream:
+                # don't consume a streamed body here
+                response_bytes = int(response.headers.get("Content-Length") or 0)
+            else:
+                response_bytes = len(response.content)
+            self._run_hooks(self.after_request_hooks, {
+                **event,
+                "status": response.status_code if response is not None else None,
+                "latency": time.perf_counter() - started,
+                "request_bytes": len(response.request.body or b"") if response is not None else 0,
+                "response_bytes": response_bytes,
+                "retries": 0,
+            })
+
     def _request(self, url, data, check_success=True):
+        self._acquire_rate_limit()
         try:
-            response = self.session.post(url=url, data=data, timeout=self.timeout)
+            response = self._post(url, data)
         except requests.exceptions.ConnectionError as e:  # pragma: nocover
             raise DataMailboxConnectionError(str(e))  # pragma: nocover
         if response.status_code != 200:
@@ -49,7 +113,31 @@ class EwonClient(object):
             raise DataMailboxStatusError(
                 "Got error code=%(code)s, message=%(message)s" % content
             )
-        return response.json()
+        return content
+
+    def _request_stream(self, url, data, chunk_size=64 * 1024):
+        """
+        Like ``_request``, but returns an iterator over the raw response body instead of decoding it.
+        """
+        self._acquire_rate_limit()
+        try:
+            response = self._post(url, data, stream=True)
+        except requests.exceptions.ConnectionError as e:  # pragma: nocover
+            raise DataMailboxConnectionError(str(e))  # pragma: nocover
+        if response.status_code != 200:
+            response.close()
+            raise DataMailboxStatusError(
+                "Bad status from talk2m: %s" % response.status_code
+            )
+
+        def iter_chunks():
+            try:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    yield chunk
+            finally:
+                response.close()
+
+        return iter_chunks()
 
 
 class DataMailbox(EwonClient):
@@ -58,9 +146,21 @@ class DataMailbox(EwonClient):
     This client only supports: getstatus, getewons, getewon, syncdata, getdata
 
     The authentication is done by providing either `username` and `password` or `token`.
+
+    Requests can be paced by passing a `rate_limiter`, eg. ``TokenBucket.for_account(account, rate=1, burst=5)``.
+    `base_url` points the client at another server, eg. a :class:`pydatamailbox.fake.FakeDataMailboxServer`.
     """
 
-    def __init__(self, account, devid, timeout=None, **kwargs):
+    def __init__(
+        self,
+        account,
+        devid,
+        timeout=None,
+        rate_limiter=None,
+        base_url=None,
+        session=None,
+        **kwargs
+    ):
         data = {"t2mdevid": devid}
         if "token" in kwargs:
             data["t2mtoken"] = kwargs["token"]
@@ -68,7 +168,14 @@ class DataMailbox(EwonClient):
             data["t2maccount"] = account
             data["t2musername"] = kwargs["username"]
             data["t2mpassword"] = kwargs["password"]
-        super().__init__("https://data.talk2m.com/", account, data, timeout)
+        super().__init__(
+            base_url or "https://data.talk2m.com/",
+            account,
+            data,
+            timeout,
+            rate_limiter,
+            session,
+        )
 
     def getstatus(self):
         """
@@ -134,12 +241,30 @@ class DataMailbox(EwonClient):
         :param bool create_transaction: The indication to the server that a new transaction ID should be created for this request.
         :param list ewon_ids: A list of Ewon gateway IDs. If ewonIds is used, DataMailbox sends values history of the targeted Ewon gateways. If not used, DataMailbox sends the values history of all Ewon gateways.
         """
+        data = self._syncdata_params(last_transaction_id, create_transaction, ewon_ids)
+        return self._request(url=self._build_url("syncdata"), data=data)
+
+    def syncdata_stream(
+        self, last_transaction_id=None, create_transaction=True, ewon_ids=None
+    ):
+        """
+        Same as `syncdata`, but the response is read incrementally rather than loaded into memory all at once.
+
+        Returns a :class:`SyncdataStream`, which yields ``(ewon, tag)`` pairs as each tag's history is read.
+        The transaction id and ``moreDataAvailable`` flag are available on the stream once it has been consumed.
+        """
+        data = self._syncdata_params(last_transaction_id, create_transaction, ewon_ids)
+        return SyncdataStream(
+            self._request_stream(url=self._build_url("syncdata"), data=data)
+        )
+
+    def _syncdata_params(self, last_transaction_id, create_transaction, ewon_ids):
         data = {**self.data, "createTransaction": create_transaction}
         if last_transaction_id:
             data["lastTransactionId"] = last_transaction_id
         if ewon_ids:
             data["ewonIds"] = ",".join([str(ewon_id) for ewon_id in ewon_ids])
-        return self._request(url=self._build_url("syncdata"), data=data)
+        return data
 
     def getdata(self, ewon_id, tag_id, from_ts, to_ts, limit=None):
         """
@@ -164,7 +289,7 @@ class DataMailbox(EwonClient):
             data["limit"] = limit
         return self._request(url=self._build_url("getdata"), data=data)
 
-    def iterate_syncdata(self, last_transaction_id=None, ewon_ids=None):
+    def iterate_syncdata(self, last_transaction_id=None, ewon_ids=None, stream=False):
         """
         Returns an iterator on syncdata.
 
@@ -174,8 +299,19 @@ class DataMailbox(EwonClient):
 
         :param last_transaction_id: The ID of the last set of data sent by the DataMailbox. By referencing the “lastTransactionId”, the DataMailbox will send a set of data more recent than the data linked to this transaction ID.
         :param list ewon_ids: A list of Ewon gateway IDs. If ewonIds is used, DataMailbox sends values history of the targeted Ewon gateways. If not used, DataMailbox sends the values history of all Ewon gateways.
+        :param bool stream: Yield a :class:`SyncdataStream` for each page instead of a decoded response. Each stream must be fully consumed before the next page is requested.
         """
         while True:
+            if stream:
+                ret = self.syncdata_stream(last_transaction_id, ewon_ids=ewon_ids)
+                yield ret
+                if not ret.finished:
+                    raise RuntimeError("Each syncdata stream must be consumed before requesting the next page")
+                if not ret.more_data_available:
+                    break
+                last_transaction_id = ret.transaction_id
+                continue
+
             ret = self.syncdata(last_transaction_id, ewon_ids=ewon_ids)
             yield ret
             if not ret.get("moreDataAvailable"):
@@ -190,14 +326,30 @@ class M2Web(EwonClient):
     This client only supports: getaccountinfo, getewons, getewon
     """
 
-    def __init__(self, account, username, password, devid, timeout=None):
+    def __init__(
+        self,
+        account,
+        username,
+        password,
+        devid,
+        timeout=None,
+        rate_limiter=None,
+        session=None,
+    ):
         data = {
             "t2maccount": account,
             "t2musername": username,
             "t2mpassword": password,
             "t2mdeveloperid": devid,
         }
-        super().__init__("https://m2web.talk2m.com/t2mapi/", account, data, timeout)
+        super().__init__(
+            "https://m2web.talk2m.com/t2mapi/",
+            account,
+            data,
+            timeout,
+            rate_limiter,
+            session,
+        )
 
     def getaccountinfo(self):
         """
@@ -16,3 +16,7 @@ class DataMailboxStatusError(DataMailboxBaseException):
 
 class DataMailboxArgsError(AttributeError):
     pass
+
+
+class DataMailboxRateLimitError(DataMailboxBaseException):
+    pass
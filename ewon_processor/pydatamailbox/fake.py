@@ -0,0 +1,425 @@
+# -*- coding: utf-8 -*-
+"""
+A local stand-in for the Talk2M DataMailbox, serving deterministic synthetic Ewons.
+
+    ewons = generate_ewons(num_ewons=2, tags_per_ewon=500, start=datetime(2024, 1, 1, tzinfo=timezone.utc))
+    with FakeDataMailboxServer(ewons, now=datetime(2024, 4, 1, tzinfo=timezone.utc)) as server:
+        dm = DataMailbox("account", "devid", token="token", base_url=server.base_url)
+        for page in dm.iterate_syncdata():
+            ...
+"""
+
+import json
+import logging
+import math
+import random
+import threading
+
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+__all__ = ("FakeDataMailboxServer", "FakeEwon", "FakeTag", "generate_ewons")
+
+log = logging.getLogger(__name__)
+
+_DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+class FakeTag(object):
+    """
+    A synthetic tag whose value at any point in its history is a pure function of its parameters.
+
+    Float tags follow a sine wave, Bool tags switch state every ``period`` points.
+    A tag with a ``first_index`` has no history before that point, so it's left out of earlier ``syncdata`` pages.
+    """
+
+    def __init__(
+        self, tag_id, name, data_type="Float", description="", period=100, phase=0, amplitude=1.0, offset=0.0,
+        first_index=0,
+    ):
+        self.id = tag_id
+        self.name = name
+        self.data_type = data_type
+        self.description = description
+        self.period = period
+        self.phase = phase
+        self.amplitude = amplitude
+        self.offset = offset
+        self.first_index = first_index
+
+    def value_at(self, index):
+        if self.data_type == "Bool":
+            return (index + self.phase) // self.period % 2 == 1
+        return round(
+            self.offset + self.amplitude * math.sin(2 * math.pi * (index + self.phase) / self.period), 3
+        )
+
+    def to_dict(self, index=None):
+        """
+        The tag as returned by the DataMailbox, with the value at ``index`` as its current value.
+        """
+        if index is not None and index < self.first_index:
+            index = None
+        return {
+            "id": self.id,
+            "name": self.name,
+            "dataType": self.data_type,
+            "description": self.description,
+            "alarmHint": "",
+            "value": self.value_at(index) if index is not None else None,
+            "quality": "good",
+            "ewonTagId": self.id,
+        }
+
+
+class FakeEwon(object):
+    """
+    A synthetic Ewon, with one history point per tag every ``interval`` from ``start``.
+
+    Dates are reported in the Ewon's clock time (``clock_tz``) labelled as UTC, as real Ewons do.
+    """
+
+    def __init__(self, ewon_id, name, tags, start, interval=timedelta(minutes=5), clock_tz=timezone.utc):
+        self.id = ewon_id
+        self.name = name
+        self.tags = tags
+        self.start = start.timestamp()
+        self.interval = interval.total_seconds()
+        self.clock_tz = clock_tz
+
+    def get_tag(self, tag_id):
+        for tag in self.tags:
+            if tag.id == tag_id:
+                return tag
+        return None
+
+    def count(self, now):
+        """
+        Number of history points per tag uploaded by ``now`` (epoch seconds).
+        """
+        if now < self.start:
+            return 0
+        return int((now - self.start) // self.interval) + 1
+
+    def timestamp(self, index):
+        return self.start + index * self.interval
+
+    def date(self, index):
+        return datetime.fromtimestamp(self.timestamp(index), self.clock_tz).strftime(_DATE_FORMAT)
+
+    def index_at(self, date):
+        """
+        Index of the first point at or after ``date``, a clock time string as sent to ``getdata``.
+        """
+        naive = datetime.fromisoformat(date).replace(tzinfo=None)
+        ts = naive.replace(tzinfo=self.clock_tz).timestamp()
+        return max(0, math.ceil((ts - self.start) / self.interval))
+
+    def history(self, tags, first, last):
+        """
+        Returns tag dicts with the history points ``first`` to ``last`` (exclusive) for each of ``tags``.
+        Tags with no history in that range are left out.
+        """
+        dates = [self.date(i) for i in range(first, last)]
+        return [
+            {
+                **tag.to_dict(last - 1),
+                "history": [
+                    {"date": date, "quality": "good", "value": tag.value_at(i)}
+                    for i, date in zip(range(first, last), dates)
+                    if i >= tag.first_index
+                ],
+            }
+            for tag in tags
+            if tag.first_index < last
+        ]
+
+
+def generate_ewons(
+    num_ewons=1,
+    tags_per_ewon=100,
+    start=None,
+    interval=timedelta(minutes=5),
+    bool_ratio=0.25,
+    clock_tz=timezone.utc,
+    seed=0,
+    late_ratio=0.0,
+    late_start=1000,
+):
+    """
+    Builds a deterministic fleet of synthetic Ewons. The same arguments always produce the same Ewons and history.
+
+    :param int num_ewons: Number of Ewons.
+    :param int tags_per_ewon: Number of tags on each Ewon.
+    :param datetime start: Date of the first history point. Defaults to 2024-01-01 UTC.
+    :param timedelta interval: Time between history points.
+    :param float bool_ratio: Proportion of tags that are ``Bool`` rather than ``Float``.
+    :param clock_tz: Clock timezone of the Ewons, or a list of timezones to cycle through.
+    :param int seed: Seed for the tag parameters.
+    :param float late_ratio: Proportion of tags (the last ones on each Ewon) with no history before ``late_start``.
+    :param int late_start: Index of the first history point of the late tags.
+    """
+    rng = random.Random(seed)
+    if start is None:
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    if not isinstance(clock_tz, (list, tuple)):
+        clock_tz = [clock_tz]
+
+    ewons = []
+    tag_id = 1
+    for n in range(num_ewons):
+        tags = []
+        first_late = tags_per_ewon - int(tags_per_ewon * late_ratio)
+        for i in range(tags_per_ewon):
+            data_type = "Bool" if rng.random() < bool_ratio else "Float"
+            tags.append(
+                FakeTag(
+                    tag_id,
+                    "%s_%04d" % (data_type, i),
+                    data_type=data_type,
+                    description="Synthetic %s tag %d" % (data_type, i),
+                    period=rng.randint(10, 1000),
+                    phase=rng.randint(0, 1000),
+                    amplitude=round(rng.uniform(1, 100), 2),
+                    offset=round(rng.uniform(-50, 50), 2),
+                    first_index=late_start if i >= first_late else 0,
+                )
+            )
+            tag_id += 1
+        ewons.append(
+            FakeEwon(100000 + n, "ewon-%03d" % n, tags, start, interval, clock_tz[n % len(clock_tz)])
+        )
+    return ewons
+
+
+class FakeDataMailboxServer(object):
+    """
+    Serves the DataMailbox api from synthetic Ewons, on a background thread.
+
+    ``syncdata`` follows the real transaction semantics: each created transaction remembers how far every Ewon's
+    history has been delivered, each page holds at most ``history_limit`` points per tag and ``moreDataAvailable``
+    is set until everything up to ``now`` has been delivered. Call :meth:`advance` to simulate new uploads.
+
+    :param list ewons: :class:`FakeEwon` s to serve. Defaults to ``generate_ewons()``.
+    :param datetime now: Time up to which history has been uploaded. Defaults to one day after the first Ewon's start.
+    :param int history_limit: Maximum number of history points per tag in a ``syncdata`` or ``getdata`` response.
+    :param str token: If set, requests with a different ``t2mtoken`` are rejected.
+    """
+
+    def __init__(self, ewons=None, now=None, history_limit=1000, token=None, host="127.0.0.1", port=0):
+        self.ewons = ewons if ewons is not None else generate_ewons()
+        if now is None:
+            now = datetime.fromtimestamp(min(e.start for e in self.ewons) + 86400, timezone.utc)
+        self.now = now.timestamp()
+        self.history_limit = history_limit
+        self.token = token
+
+        self.request_log = []
+        self._transactions = {}
+        self._next_transaction_id = 1000
+
+        self._lock = threading.RLock()
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return "http://%s:%s/" % (host, port)
+
+    @property
+    def request_count(self):
+        return len(self.request_log)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def advance(self, delta):
+        """
+        Moves ``now`` forward, making the history points in between available.
+        """
+        with self._lock:
+            self.now += delta.total_seconds() if isinstance(delta, timedelta) else delta
+
+    def get_ewon(self, ewon_id=None, name=None):
+        for ewon in self.ewons:
+            if (ewon_id is not None and str(ewon.id) == str(ewon_id)) or (name is not None and ewon.name == name):
+                return ewon
+        return None
+
+    def handle(self, path, params):
+        with self._lock:
+            self.request_log.append((path, params))
+
+            if "t2mdevid" not in params or ("t2mtoken" not in params and "t2musername" not in params):
+                return _error(400, "Missing authentication parameters")
+            if self.token is not None and params.get("t2mtoken") != self.token:
+                return _error(403, "Invalid token")
+
+            func = {
+                "getstatus": self._getstatus,
+                "getewons": self._getewons,
+                "getewon": self._getewon,
+                "syncdata": self._syncdata,
+                "getdata": self._getdata,
+            }.get(path.strip("/"))
+            if func is None:
+                return 404, None
+            return 200, func(params)
+
+    def _getstatus(self, params):
+        ewons = []
+        for ewon in self.ewons:
+            count = ewon.count(self.now)
+            ewons.append(
+                {
+                    "id": ewon.id,
+                    "name": ewon.name,
+                    "historyCount": count * len(ewon.tags),
+                    "firstHistoryDate": ewon.date(0) if count else None,
+                    "lastHistoryDate": ewon.date(count - 1) if count else None,
+                }
+            )
+        return {
+            "historyCount": sum(e["historyCount"] for e in ewons),
+            "ewonsCount": len(ewons),
+            "ewons": ewons,
+        }
+
+    def _ewon_summary(self, ewon):
+        count = ewon.count(self.now)
+        return {
+            "id": ewon.id,
+            "name": ewon.name,
+            "numberOfTags": len(ewon.tags),
+            "lastSynchroDate": ewon.date(count - 1) if count else None,
+        }
+
+    def _getewons(self, params):
+        return {"success": True, "ewons": [self._ewon_summary(ewon) for ewon in self.ewons]}
+
+    def _getewon(self, params):
+        ewon = self.get_ewon(params.get("id"), params.get("name"))
+        if ewon is None:
+            return _error(404, "Ewon not found")[1]
+        count = ewon.count(self.now)
+        return {
+            "success": True,
+            **self._ewon_summary(ewon),
+            "tags": [tag.to_dict(count - 1 if count else None) for tag in ewon.tags],
+        }
+
+    def _syncdata(self, params):
+        last_transaction_id = params.get("lastTransactionId")
+        if last_transaction_id:
+            try:
+                delivered = self._transactions[int(last_transaction_id)]
+            except (KeyError, ValueError):
+                return _error(400, "Unknown transaction id %s" % last_transaction_id)[1]
+        else:
+            delivered = {}
+
+        selected = self.ewons
+        if params.get("ewonIds"):
+            ewon_ids = params["ewonIds"].split(",")
+            selected = [ewon for ewon in self.ewons if str(ewon.id) in ewon_ids]
+
+        cursor = {}
+        ewons = []
+        more_data_available = False
+        for ewon in self.ewons:
+            count = ewon.count(self.now)
+            if ewon not in selected:
+                ## history of unselected ewons is skipped over, as the real DataMailbox does
+                cursor[ewon.id] = count
+                continue
+
+            first = delivered.get(ewon.id, 0)
+            last = min(count, first + self.history_limit)
+            cursor[ewon.id] = last
+            more_data_available = more_data_available or last < count
+            if last > first:
+                ewons.append(
+                    {
+                        "id": ewon.id,
+                        "name": ewon.name,
+                        "lastSynchroDate": ewon.date(count - 1),
+                        "tags": ewon.history(ewon.tags, first, last),
+                    }
+                )
+
+        transaction_id = int(last_transaction_id) if last_transaction_id else None
+        if params.get("createTransaction", "True").lower() == "true":
+            transaction_id = self._next_transaction_id
+            self._next_transaction_id += 1
+            self._transactions[transaction_id] = cursor
+
+        return {
+            "success": True,
+            "transactionId": transaction_id,
+            "moreDataAvailable": more_data_available,
+            "ewons": ewons,
+        }
+
+    def _getdata(self, params):
+        ewon = self.get_ewon(params.get("ewonId"))
+        if ewon is None:
+            return _error(404, "Ewon not found")[1]
+        tag = ewon.get_tag(int(params.get("tagId", 0)))
+        if tag is None:
+            return _error(404, "Tag not found")[1]
+
+        count = ewon.count(self.now)
+        first = ewon.index_at(params["from"]) if params.get("from") else 0
+        last = min(count, ewon.index_at(params["to"])) if params.get("to") else count
+        limit = min(int(params.get("limit") or self.history_limit), self.history_limit)
+        more_data_available = last - first > limit
+        last = max(first, min(last, first + limit))
+
+        return {
+            "success": True,
+            "moreDataAvailable": more_data_available,
+            "ewons": [{"id": ewon.id, "name": ewon.name, "tags": ewon.history([tag], first, last)}],
+        }
+
+
+def _error(code, message):
+    return 200, {"success": False, "code": code, "message": message}
+
+
+def _make_handler(server):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length).decode() if length else ""
+            params = {key: values[0] for key, values in parse_qs(body).items()}
+
+            status, data = server.handle(self.path.split("?", 1)[0], params)
+            payload = json.dumps(data).encode() if data is not None else b""
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            log.debug(format, *args)
+
+    return Handler
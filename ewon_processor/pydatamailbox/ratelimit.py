@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import threading
+import time
+
+from pydatamailbox.exceptions import DataMailboxArgsError, DataMailboxRateLimitError
+
+__all__ = ("TokenBucket",)
+
+
+class TokenBucket(object):
+    """
+    Token bucket rate limiter, safe to share between threads and asyncio tasks.
+
+    Tokens refill at ``rate`` per second up to ``burst``. Each request takes one token, waiting for one if needed.
+    An optional ``budget`` caps the total number of requests; once it's spent,
+    :class:`DataMailboxRateLimitError` is raised rather than waiting.
+
+    Use :meth:`for_account` to share one bucket between every client on the same Talk2M account.
+    Only the rate is shared between calls to it; the budget starts again each time.
+    """
+
+    _accounts = {}
+    _accounts_lock = threading.Lock()
+
+    def __init__(self, rate, burst=1, budget=None):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.budget = budget
+        self.used = 0
+
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_account(cls, account, rate, burst=1, budget=None):
+        """
+        Returns the bucket shared by every client of ``account``, creating it if needed.
+
+        An existing bucket keeps its tokens, but takes the new ``rate``, ``burst`` and ``budget``,
+        and its budget is reset. Call this once per run (eg. per processor invocation).
+        """
+        with cls._accounts_lock:
+            bucket = cls._accounts.get(account)
+            if bucket is None:
+                bucket = cls._accounts[account] = cls(rate, burst, budget)
+            else:
+                bucket.configure(rate, burst, budget)
+            return bucket
+
+    def configure(self, rate, burst=1, budget=None):
+        """
+        Changes the rate, burst and budget, and resets the budget's usage.
+        """
+        with self._lock:
+            self._refill()
+            self.rate = float(rate)
+            self.burst = float(burst)
+            self._tokens = min(self._tokens, self.burst)
+            self.budget = budget
+            self.used = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def _try_acquire(self, tokens):
+        """
+        Takes the tokens if they're available and returns 0, otherwise returns how long to wait for them.
+        """
+        with self._lock:
+            if tokens > self.burst:
+                # the bucket never holds more than `burst` tokens, so this would wait forever
+                raise DataMailboxArgsError(
+                    "Can't acquire %s tokens at once with a burst of %s" % (tokens, self.burst)
+                )
+            if self.budget is not None and self.used + tokens > self.budget:
+                raise DataMailboxRateLimitError(
+                    "Request budget of %s exhausted" % self.budget
+                )
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                self.used += tokens
+                return 0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens=1, timeout=None):
+        """
+        Blocks until ``tokens`` are available. Raises :class:`DataMailboxRateLimitError` after ``timeout`` seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._try_acquire(tokens)
+            if not wait:
+                return
+            if deadline is not None and time.monotonic() + wait > deadline:
+                raise DataMailboxRateLimitError(
+                    "Timed out waiting for rate limit after %ss" % timeout
+                )
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens=1, timeout=None):
+        """
+        Same as :meth:`acquire`, but waits without blocking the event loop.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._try_acquire(tokens)
+            if not wait:
+                return
+            if deadline is not None and time.monotonic() + wait > deadline:
+                raise DataMailboxRateLimitError(
+                    "Timed out waiting for rate limit after %ss" % timeout
+                )
+            await asyncio.sleep(wait)
+
+    @property
+    def available(self):
+        """
+        Number of requests that can be made right now without waiting.
+        """
+        with self._lock:
+            self._refill()
+            available = int(self._tokens)
+        if self.budget is not None:
+            available = min(available, self.remaining)
+        return available
+
+    @property
+    def remaining(self):
+        """
+        Number of requests left in the budget, or None if there's no budget.
+        """
+        if self.budget is None:
+            return None
+        return max(0, self.budget - self.used)
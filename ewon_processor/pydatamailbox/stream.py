@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+
+import codecs
+import json
+
+from pydatamailbox.exceptions import DataMailboxResponseError, DataMailboxStatusError
+
+__all__ = ("SyncdataStream",)
+
+
+_WHITESPACE = " \t\r\n"
+_decoder = json.JSONDecoder()
+
+
+class _JsonReader(object):
+    """
+    Pulls JSON values out of a stream of text (or utf-8 bytes) chunks, buffering no more than the value being read.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _read_more(self, min_size=1):
+        # drop everything that's already been consumed
+        if self._pos:
+            self._buf = self._buf[self._pos:]
+            self._pos = 0
+
+        target = len(self._buf) + min_size
+        while len(self._buf) < target:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                self._buf += self._utf8.decode(b"", final=True)
+                self._eof = True
+                return False
+            if isinstance(chunk, bytes):
+                chunk = self._utf8.decode(chunk)
+            self._buf += chunk
+        return True
+
+    def peek(self):
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._read_more():
+                return ""
+
+    def consume(self, char):
+        found = self.peek()
+        if found != char:
+            raise DataMailboxResponseError(
+                "Cannot deserialize json: expected %r, got %r" % (char, found)
+            )
+        self._pos += 1
+
+    def read_value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buf, self._pos)
+                # a value running up to the end of the buffer (eg. a number) might continue in the next chunk
+                if end < len(self._buf) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise DataMailboxResponseError(
+                        "Cannot deserialize json from %s" % self._buf[self._pos:self._pos + 100]
+                    )
+            # at least double what's buffered, so a large value isn't re-parsed once per chunk
+            self._read_more(max(1, len(self._buf) - self._pos))
+
+    def members(self):
+        """Iterate the keys of an object. The caller must read each key's value before continuing."""
+        self.consume("{")
+        if self.peek() == "}":
+            self.consume("}")
+            return
+        while True:
+            key = self.read_value()
+            self.consume(":")
+            yield key
+            if self.peek() == ",":
+                self.consume(",")
+            else:
+                self.consume("}")
+                return
+
+    def items(self):
+        """Iterate the items of an array. The caller must read each item before continuing."""
+        self.consume("[")
+        if self.peek() == "]":
+            self.consume("]")
+            return
+        while True:
+            yield
+            if self.peek() == ",":
+                self.consume(",")
+            else:
+                self.consume("]")
+                return
+
+
+class SyncdataStream(object):
+    """
+    Incrementally parses a syncdata response, yielding ``(ewon, tag)`` pairs as each tag's history arrives.
+
+    ``ewon`` is a dict of the Ewon's fields read so far (typically ``id`` and ``name``), and ``tag`` is the full tag,
+    including its history. Only one tag is held in memory at a time.
+
+    The top level fields (``transactionId``, ``moreDataAvailable``, ...) are available in ``summary``
+    once the stream has been fully iterated.
+    """
+
+    def __init__(self, chunks, check_success=True):
+        self._reader = _JsonReader(chunks)
+        self.check_success = check_success
+        self.summary = {}
+        self.finished = False
+
+    @property
+    def transaction_id(self):
+        return self.summary.get("transactionId")
+
+    @property
+    def more_data_available(self):
+        return bool(self.summary.get("moreDataAvailable"))
+
+    def __iter__(self):
+        reader = self._reader
+        for key in reader.members():
+            if key != "ewons":
+                self.summary[key] = reader.read_value()
+                continue
+
+            for _ in reader.items():
+                ewon = {}
+                for ewon_key in reader.members():
+                    if ewon_key != "tags":
+                        ewon[ewon_key] = reader.read_value()
+                        continue
+                    for _ in reader.items():
+                        yield ewon, reader.read_value()
+
+        self.finished = True
+        if self.check_success and not self.summary.get("success"):
+            raise DataMailboxStatusError(
+                "Got error code=%s, message=%s"
+                % (self.summary.get("code"), self.summary.get("message"))
+            )
@@ -335,7 +335,7 @@ class CLI:
             channel = self.api.get_channel(channel_name)
         except NotFound:
             print(channel_name, self.agent_id)
-            channel = self.api.get_channel_named(channel_name, self.agent_id)
+            channel = self.api.get_channel_named(channel_name, self.agent_id, use_cache=False)
 
         print(self.format_channel_info(channel))
 
@@ -490,7 +490,7 @@ class CLI:
     @annotate_arg("poll_rate", "Frequency to check for new messages (in seconds)")
     def follow_channel(self, channel_name: str, poll_rate: int = 5):
         """Follow aggregate of a doover channel"""
-        channel = self.api.get_channel_named(channel_name, self.agent_id)
+        channel = self.api.get_channel_named(channel_name, self.agent_id, use_cache=False)
         print(self.format_channel_info(channel))
 
         while True:
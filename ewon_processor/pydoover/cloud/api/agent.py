@@ -1,6 +1,3 @@
-from .channel import Channel
-
-
 class Agent:
 
     def __init__(self, client, data):
@@ -29,7 +26,7 @@ class Agent:
         if 'settings' in data and 'deployment_config' in data['settings']: self.deployment_config = data["settings"]["deployment_config"]
         else: self.deployment_config = None
 
-        self.channels = [Channel(data=c, client=self.client) for c in data["channels"]]
+        self.channels = [self.client._parse_channel(c) for c in data["channels"]]
 
     @property
     def agent_id(self):
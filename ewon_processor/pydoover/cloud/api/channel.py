@@ -85,6 +85,9 @@ class Channel:
     def publish(self, data: Any, save_log: bool = True, log_aggregate: bool = False, override_aggregate: bool = False, timestamp: Optional[datetime] = None):
         return self.client.publish_to_channel(self.id, data, save_log, log_aggregate, override_aggregate, timestamp)
 
+    def publish_many(self, records, save_log: bool = True, max_payload_size: Optional[int] = None):
+        return self.client.publish_many(self.id, records, save_log, max_payload_size)
+
     @property
     def last_message(self):
         messages = self.fetch_messages(num_messages=1)
@@ -185,6 +188,9 @@ class Task(Channel):
     def fetch_processor(self) -> Optional[Processor]:
         if self._processor is not None:
             return self._processor
+        if self.processor_id is None:
+            # tasks listed from the get_agent endpoint don't include their processor, so make sure we have the full task.
+            self.update()
         if self.processor_id is None:
             return
 
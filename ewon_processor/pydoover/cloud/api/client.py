@@ -1,8 +1,10 @@
+import json
 import logging
+import time
 
 from collections import namedtuple
 from datetime import datetime, timedelta
-from typing import Any, Union, Callable, overload, Literal, Optional, TypeVar
+from typing import Any, Union, Callable, overload, Literal, Optional, TypeVar, Iterable
 from urllib.parse import quote, urlencode
 
 import requests
@@ -17,10 +19,18 @@ log = logging.getLogger(__name__)
 AccessToken = namedtuple("AccessToken", ["token", "expires_at"], defaults=(None, ))
 T = TypeVar("T", bound=Channel)
 
+# base URLs whose servers have rejected the batch publish endpoint, kept for the life of the process
+# so new clients (eg. in each warm invocation of a processor) don't probe it again.
+_batch_publish_unsupported: set[str] = set()
+# responses to the batch endpoint that mean the server doesn't have it
+_BATCH_ROUTE_MISSING_STATUSES = (404, 405, 501)
+
 
 class Route:
     def __init__(self, method, route, *args, **kwargs):
         self.method = method
+        # the unformatted route, eg. "/ch/v1/channel/{}/", for grouping metrics by endpoint
+        self.template = route
 
         self.url = route
         if args:
@@ -30,6 +40,14 @@ class Route:
             self.url = f"{self.url}?{urlencode(kwargs)}"
 
 
+def _run_request_hooks(hooks, event: dict[str, Any]):
+    for hook in hooks:
+        try:
+            hook(event)
+        except Exception as e:
+            log.warning(f"Request hook {hook} failed: {e}")
+
+
 class Client:
 
     def __init__(
@@ -42,6 +60,7 @@ class Client:
         agent_id: str = None,
         verify: bool = True,
         login_callback: Callable = None,
+        session: requests.Session = None,
     ):
         self.access_token = AccessToken(token, token_expires)
         self.agent_id = agent_id
@@ -52,11 +71,26 @@ class Client:
 
         self.verify = verify
         self.base_url = base_url
-        self.session = requests.Session()
+        # a session can be passed in to reuse its connections, eg. across warm invocations of a processor
+        self.session = session or requests.Session()
 
         self.request_retries = 1
         self.request_timeout = 25
 
+        # maximum size (in bytes) of the JSON body sent in a single batched publish request.
+        self.max_publish_payload_size = 256 * 1024
+        # set to False the first time the server rejects the batch endpoint, so we fall back to single publishes from then on.
+        self.batch_publish_supported = base_url not in _batch_publish_unsupported
+
+        # (agent_id, channel_name) -> (expires_at, channel). Set the TTL to 0 to disable caching.
+        self.channel_cache_ttl = 300
+        self._channel_cache: dict[tuple[str, str], tuple[float, Channel]] = dict()
+
+        # called with a dict describing each request, before it's sent and after it's finished (including retries).
+        # See `pydoover.cloud.api.metrics.RequestMetrics` for an aggregator that can be added to `after_request_hooks`.
+        self.before_request_hooks: list[Callable[[dict[str, Any]], None]] = []
+        self.after_request_hooks: list[Callable[[dict[str, Any]], None]] = []
+
         if not ((username and password) or token):
             raise RuntimeError("Must have username and password or access token set.")
         elif token:
@@ -74,40 +108,56 @@ class Client:
 
         url = self.base_url + route.url
 
+        event = {"client": "doover", "method": route.method, "route": route.template, "url": url}
+        _run_request_hooks(self.before_request_hooks, event)
+        started = time.perf_counter()
+        resp = None
+
         attempt_counter = 0
         retries = self.request_retries if route.method == "GET" else 0
 
-        while attempt_counter <= retries:
-            attempt_counter += 1
-
-            log.debug(f"Making {route.method} request to {url} with kwargs {kwargs}")
-            
-            try:
-                resp = self.session.request(route.method, url, timeout=self.request_timeout, **kwargs)
-            except requests.exceptions.Timeout:
-                log.info(f"Request to {url} timed out.")
-                if attempt_counter > retries:
-                    raise HTTPException(f"Request timed out. {url}")
-                continue
-
-            if resp.status_code == 200:
-                ## if we get a 200, we're good to go
-                break
-            elif resp.status_code == 403:
-                raise Forbidden(f"Access denied. {url}")
-            elif resp.status_code == 404:
-                raise NotFound(f"Resource not found. {url}")
-            elif resp.status_code != 200:
-                log.info(f"Failed to make request to {url}. Status code: {resp.status_code}, message: {resp.text}")
-                if attempt_counter > retries:
-                    raise HTTPException(resp.text)
+        try:
+            while attempt_counter <= retries:
+                attempt_counter += 1
+
+                log.debug("Making %s request to %s with kwargs %s", route.method, url, kwargs)
+
+                try:
+                    resp = self.session.request(route.method, url, timeout=self.request_timeout, **kwargs)
+                except requests.exceptions.Timeout:
+                    resp = None
+                    log.info(f"Request to {url} timed out.")
+                    if attempt_counter > retries:
+                        raise HTTPException(f"Request timed out. {url}")
+                    continue
+
+                if resp.status_code == 200:
+                    ## if we get a 200, we're good to go
+                    break
+                elif resp.status_code == 403:
+                    raise Forbidden(f"Access denied. {url}")
+                elif resp.status_code == 404:
+                    raise NotFound(f"Resource not found. {url}")
+                elif resp.status_code != 200:
+                    log.info(f"Failed to make request to {url}. Status code: {resp.status_code}, message: {resp.text}")
+                    if attempt_counter > retries:
+                        raise HTTPException(resp.text, status_code=resp.status_code)
+        finally:
+            _run_request_hooks(self.after_request_hooks, {
+                **event,
+                "status": resp.status_code if resp is not None else None,
+                "latency": time.perf_counter() - started,
+                "request_bytes": len(resp.request.body or b"") if resp is not None else 0,
+                "response_bytes": len(resp.content) if resp is not None else 0,
+                "retries": max(attempt_counter - 1, 0),
+            })
 
         try:
             data = resp.json()
         except ValueError:
             data = resp.text
 
-        log.debug(f"{url} has received {data}")
+        log.debug("%s has received %s", url, data)
         return data
 
     def _get_agent_raw(self, agent_id: str) -> dict[str, Any]:
@@ -118,7 +168,14 @@ class Client:
 
     def get_agent(self, agent_id: str) -> Optional[Agent]:
         data = self._get_agent_raw(agent_id)
-        return data and Agent(client=self, data=data)
+        if not data:
+            return data
+
+        agent = Agent(client=self, data=data)
+        # we've got the full channel list for free, so use it to warm the channel cache.
+        for channel in agent.channels:
+            self._cache_channel(channel)
+        return agent
 
     def get_agent_list(self) -> list[Agent]:
         data = self._get_agent_list_raw()
@@ -126,6 +183,27 @@ class Client:
             return []
         return [Agent(client=self, data=d) for d in data["agents"]]
 
+    def _cache_channel(self, channel: Channel) -> None:
+        if self.channel_cache_ttl and channel.agent_id and channel.name:
+            self._channel_cache[(channel.agent_id, channel.name)] = (time.monotonic() + self.channel_cache_ttl, channel)
+
+    def _get_cached_channel(self, channel_name: str, agent_id: str) -> Optional[Channel]:
+        try:
+            expires_at, channel = self._channel_cache[(agent_id, channel_name)]
+        except KeyError:
+            return None
+
+        if time.monotonic() > expires_at:
+            self._channel_cache.pop((agent_id, channel_name), None)
+            return None
+        return channel
+
+    def invalidate_channel_cache(self, channel_name: Optional[str] = None, agent_id: Optional[str] = None) -> None:
+        """Drop cached channel lookups matching the given channel name and / or agent ID (or all of them if neither is given)."""
+        for key in list(self._channel_cache.keys()):
+            if (agent_id is None or key[0] == agent_id) and (channel_name is None or key[1] == channel_name):
+                self._channel_cache.pop(key, None)
+
     def _parse_channel(self, data) -> T:
         if data["name"].startswith("!"):
             return Task(client=self, data=data)
@@ -139,14 +217,34 @@ class Client:
 
     def get_channel(self, channel_id: str) -> Optional[T]:
         data = self._get_channel_raw(channel_id)
-        return data and self._parse_channel(data)
+        if not data:
+            return data
+
+        channel = self._parse_channel(data)
+        self._cache_channel(channel)
+        return channel
 
     def _get_channel_named_raw(self, channel_name: str, agent_id: str) -> dict[str, Any]:
         return self.request(Route("GET", "/ch/v1/agent/{}/{}/", agent_id, channel_name))
 
-    def get_channel_named(self, channel_name: str, agent_id: str) -> Optional[T]:
+    def get_channel_named(self, channel_name: str, agent_id: str, use_cache: bool = True) -> Optional[T]:
+        """Get a channel by name.
+
+        Lookups are cached for `channel_cache_ttl` seconds, so the cached channel's aggregate may be stale.
+        Pass `use_cache=False` to always fetch the channel (and its aggregate) from the server.
+        """
+        if use_cache:
+            channel = self._get_cached_channel(channel_name, agent_id)
+            if channel is not None:
+                return channel
+
         data = self._get_channel_named_raw(channel_name, agent_id)
-        return data and self._parse_channel(data)
+        if not data:
+            return data
+
+        channel = self._parse_channel(data)
+        self._cache_channel(channel)
+        return channel
 
     def get_channel_messages(self, channel_id: str, num_messages: Optional[int] = None) -> list[Message]:
         if num_messages:
@@ -175,7 +273,7 @@ class Client:
         self.request(Route("POST", "/ch/v1/agent/{}/{}/", agent_id, channel_name))
         # this is a bit of a wasted API call, but since this is the same method to post an aggregate to a
         # channel it can either return a new channel ID (if created), or the message ID of the posted message.
-        return self.get_channel_named(channel_name, agent_id)
+        return self.get_channel_named(channel_name, agent_id, use_cache=False)
 
     def create_processor(self, processor_name: str, agent_id: str) -> Processor:
         return self.create_channel("#" + processor_name.lstrip('#'), agent_id)
@@ -187,7 +285,7 @@ class Client:
             "processor_id": processor_id
         }
         self.request(Route("POST", "/ch/v1/agent/{}/{}/", agent_id, task), json=payload)
-        return self.get_channel_named(task, agent_id)
+        return self.get_channel_named(task, agent_id, use_cache=False)
 
     def _maybe_subscribe_to_channel(self, channel_id: str, task_id: str, subscribe: bool):
         data = {"channel_id": channel_id, "subscribe": subscribe}
@@ -216,6 +314,70 @@ class Client:
         else:
             return self.request(Route("POST", "/ch/v1/channel/{}/", channel_id), data=str(post_data))
 
+    def publish_many(self, channel_id: str, records: Iterable[tuple[Optional[datetime], Any]], save_log: bool = True, max_payload_size: Optional[int] = None) -> list[Any]:
+        """Publish an ordered sequence of (timestamp, data) records to a channel in as few requests as possible.
+
+        Records are packed into batches whose JSON body stays under `max_payload_size` bytes
+        (defaults to `Client.max_publish_payload_size`). A single record larger than the limit is sent on its own.
+        If the server doesn't support batched publishing, each record is published individually, in order.
+        """
+        max_payload_size = max_payload_size or self.max_publish_payload_size
+
+        messages = []
+        for timestamp, data in records:
+            message = {"msg": data}
+            if timestamp:
+                message["timestamp"] = int(timestamp.timestamp())
+            messages.append(message)
+
+        if not self.batch_publish_supported:
+            return [self._publish_message(channel_id, m, save_log) for m in messages]
+
+        # size of the batch envelope, plus a separator between each message.
+        base_size = len(json.dumps({"messages": [], "record_log": save_log}))
+        batches = []
+        batch, batch_size = [], base_size
+        for message in messages:
+            message_size = len(json.dumps(message)) + 2
+            if batch and batch_size + message_size > max_payload_size:
+                batches.append(batch)
+                batch, batch_size = [], base_size
+            batch.append(message)
+            batch_size += message_size
+        if batch:
+            batches.append(batch)
+
+        results = []
+        while batches:
+            batch = batches.pop(0)
+            try:
+                results.append(self.request(
+                    Route("POST", "/ch/v1/channel/{}/batch/", channel_id),
+                    json={"messages": batch, "record_log": save_log},
+                ))
+            except (NotFound, HTTPException) as e:
+                status = 404 if isinstance(e, NotFound) else e.status_code
+                if status == 413 and len(batch) > 1:
+                    # the server's limit is lower than max_payload_size, so retry in halves
+                    half = len(batch) // 2
+                    batches[:0] = [batch[:half], batch[half:]]
+                    continue
+                if results or status not in _BATCH_ROUTE_MISSING_STATUSES:
+                    raise
+
+                # a 404 could also mean the channel doesn't exist, in which case this raises too,
+                # so batching is only turned off once a single publish has worked.
+                first = self._publish_message(channel_id, messages[0], save_log)
+                log.info("Batch publishing isn't supported by this server, falling back to single publishes.")
+                self.batch_publish_supported = False
+                _batch_publish_unsupported.add(self.base_url)
+                return [first] + [self._publish_message(channel_id, m, save_log) for m in messages[1:]]
+
+        return results
+
+    def _publish_message(self, channel_id: str, message: dict[str, Any], save_log: bool = True):
+        return self.request(Route("POST", "/ch/v1/channel/{}/", channel_id), json={**message, "record_log": save_log})
+
     def publish_to_channel_name(self, agent_id: str, channel_name: str, data: Any, save_log: bool = True, log_aggregate: bool = False, override_aggregate: bool = False, timestamp: Optional[datetime] = None):
         post_data = {"msg": data}
         
@@ -296,5 +458,5 @@ class Client:
         try:
             self.login_callback()
         except Exception as e:
-            print(f"failed to call callback: {e}")
+            log.error("failed to call callback: %s", e)
             pass
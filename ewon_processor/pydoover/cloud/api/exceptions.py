@@ -3,7 +3,10 @@ class DooverException(Exception):
 
 
 class HTTPException(DooverException):
-    pass
+    def __init__(self, *args, status_code: int = None):
+        super().__init__(*args)
+        # None if the request didn't get a response, eg. it timed out
+        self.status_code = status_code
 
 
 class NotFound(DooverException):
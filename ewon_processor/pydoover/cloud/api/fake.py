@@ -0,0 +1,410 @@
+"""
+A local stand-in for the Doover channel API, for exercising `Client` without a live Doover host.
+
+    with FakeDooverServer(latency=0.05) as server:
+        client = Client(token="fake", base_url=server.base_url)
+        ...
+        print(server.request_count, server.get_messages(channel_id))
+
+Latency and faults can be injected to see how callers behave against a slow or flaky host:
+
+    server.fail_next(2, status=503, path="/ch/v1/channel/")
+"""
+
+import json
+import logging
+import random
+import re
+import threading
+import time
+import uuid
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+from urllib.parse import unquote
+
+from ...utils import apply_diff
+
+
+log = logging.getLogger(__name__)
+
+
+class FakeAgent:
+    def __init__(self, agent_id: str = None, name: str = None, agent_type: str = "doover_users | user", deployment_config: Any = None):
+        self.id = agent_id or str(uuid.uuid4())
+        self.name = name
+        self.type = agent_type
+        self.deployment_config = deployment_config
+
+    def to_dict(self, channels):
+        return {
+            "agent": self.id,
+            "name": self.name,
+            "type": self.type,
+            "current_time": time.time(),
+            "settings": {"deployment_config": self.deployment_config},
+            "channels": [
+                {"channel": c.id, "name": c.name, "type": c.type, "agent": self.id} for c in channels
+            ],
+        }
+
+
+class FakeChannel:
+    def __init__(self, agent_id: str, name: str, channel_id: str = None):
+        self.id = channel_id or str(uuid.uuid4())
+        self.agent_id = agent_id
+        self.name = name
+        self.aggregate = None
+        self.messages = []
+
+        # only used by task channels
+        self.processor_id = None
+        self.subscriptions: set[str] = set()
+
+    @property
+    def type(self):
+        if self.name.startswith("!"):
+            return "task"
+        elif self.name.startswith("#"):
+            return "processor"
+        return "base"
+
+    def to_dict(self):
+        data = {
+            "channel": self.id,
+            "name": self.name,
+            "owner": self.agent_id,
+            "type": self.type,
+            "aggregate": {"payload": self.aggregate},
+        }
+        if self.processor_id is not None:
+            data["processor"] = self.processor_id
+        return data
+
+    def publish(self, data: Any, record_log: bool = True, override_aggregate: bool = False, timestamp: Optional[int] = None):
+        if override_aggregate or not (isinstance(data, dict) and isinstance(self.aggregate, dict)):
+            self.aggregate = data
+        else:
+            apply_diff(self.aggregate, data)
+
+        message = {
+            "message": str(uuid.uuid4()),
+            "agent": self.agent_id,
+            "channel": self.id,
+            "channel_name": self.name,
+            "timestamp": timestamp or time.time(),
+            "payload": data,
+        }
+        if record_log:
+            self.messages.append(message)
+        return message
+
+
+class FakeDooverServer:
+    """Serves the `/ch/v1/` routes used by `Client` from in-memory state, on a background thread.
+
+    Parameters
+    ----------
+    host: str
+    port: int
+        Port to listen on. Defaults to 0, which picks a free port.
+    max_payload_size: int
+        Request bodies larger than this (in bytes) are rejected with a 413.
+    latency: float
+        Seconds to wait before answering each request. Concurrent requests wait in parallel, as they would over a network.
+    jitter: float
+        Up to this many seconds are randomly added to the latency of each request.
+    fault_rate: float
+        Proportion of requests that fail with `fault_status`, chosen at random.
+    fault_status: int
+        Status code returned for random faults.
+    seed: int
+        Seed for the jitter and random faults, so runs are repeatable.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        max_payload_size: Optional[int] = None,
+        latency: float = 0,
+        jitter: float = 0,
+        fault_rate: float = 0,
+        fault_status: int = 500,
+        seed: Optional[int] = None,
+    ):
+        self.max_payload_size = max_payload_size
+        self.latency = latency
+        self.jitter = jitter
+        self.fault_rate = fault_rate
+        self.fault_status = fault_status
+
+        self.agents: dict[str, FakeAgent] = dict()
+        self.channels: dict[str, FakeChannel] = dict()
+        self.request_log: list[tuple[str, str]] = []
+
+        self._random = random.Random(seed)
+        # (remaining, status, method, path prefix) of faults queued by `fail_next`
+        self._faults: list[list] = []
+
+        self._lock = threading.RLock()
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def request_count(self):
+        return len(self.request_log)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def reset_request_log(self):
+        self.request_log.clear()
+
+    def fail_next(self, count: int = 1, status: int = 500, method: Optional[str] = None, path: Optional[str] = None):
+        """Make the next `count` requests (optionally only those matching `method` and starting with `path`) fail with `status`."""
+        with self._lock:
+            self._faults.append([count, status, method, path])
+
+    def _next_fault(self, method: str, path: str) -> Optional[int]:
+        for fault in self._faults:
+            count, status, fault_method, fault_path = fault
+            if (fault_method is None or fault_method == method) and (fault_path is None or path.startswith(fault_path)):
+                fault[0] -= 1
+                if fault[0] <= 0:
+                    self._faults.remove(fault)
+                return status
+
+        if self.fault_rate and self._random.random() < self.fault_rate:
+            return self.fault_status
+        return None
+
+    def _delay(self):
+        with self._lock:
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def create_agent(self, agent_id: Optional[str] = None, name: Optional[str] = None, deployment_config: Any = None, **kwargs) -> FakeAgent:
+        with self._lock:
+            agent = self.agents.get(agent_id)
+            if agent is None:
+                agent = FakeAgent(agent_id, name, deployment_config=deployment_config, **kwargs)
+                self.agents[agent.id] = agent
+            return agent
+
+    def get_channel_named(self, agent_id: str, name: str) -> Optional[FakeChannel]:
+        for channel in self.channels.values():
+            if channel.agent_id == agent_id and channel.name == name:
+                return channel
+        return None
+
+    def create_channel(self, agent_id: str, name: str, aggregate: Any = None) -> FakeChannel:
+        with self._lock:
+            channel = self.get_channel_named(agent_id, name)
+            if channel is None:
+                self.create_agent(agent_id)
+                channel = FakeChannel(agent_id, name)
+                self.channels[channel.id] = channel
+            if aggregate is not None:
+                channel.aggregate = aggregate
+            return channel
+
+    def get_messages(self, channel_id: str) -> list[dict[str, Any]]:
+        return self.channels[channel_id].messages
+
+    def _publish(self, channel: FakeChannel, body: dict[str, Any]):
+        return channel.publish(
+            body.get("msg"),
+            record_log=body.get("record_log", True),
+            override_aggregate=body.get("override_aggregate", False),
+            timestamp=body.get("timestamp"),
+        )
+
+    def handle(self, method: str, path: str, body: Any) -> tuple[int, Any]:
+        self._delay()
+
+        with self._lock:
+            self.request_log.append((method, path))
+
+            fault = self._next_fault(method, path)
+            if fault is not None:
+                return fault, {"detail": "Injected fault."}
+
+            for route_method, pattern, func in self._routes():
+                if route_method != method:
+                    continue
+                match = pattern.fullmatch(path)
+                if match:
+                    return func(body, *[g and unquote(g) for g in match.groups()])
+
+            return 404, {"detail": "Not found."}
+
+    def _routes(self):
+        return [
+            ("GET", _ROUTE_LIST_AGENTS, self._get_agent_list),
+            ("GET", _ROUTE_AGENT, self._get_agent),
+            ("GET", _ROUTE_CHANNEL_MESSAGES, self._get_channel_messages),
+            ("GET", _ROUTE_CHANNEL_MESSAGE, self._get_channel_message),
+            ("POST", _ROUTE_CHANNEL_SUBSCRIBE, self._post_channel_subscribe),
+            ("GET", _ROUTE_CHANNEL, self._get_channel),
+            ("POST", _ROUTE_CHANNEL, self._post_channel),
+            ("POST", _ROUTE_CHANNEL_BATCH, self._post_channel_batch),
+            ("GET", _ROUTE_CHANNEL_NAMED, self._get_channel_named),
+            ("POST", _ROUTE_CHANNEL_NAMED, self._post_channel_named),
+        ]
+
+    def _get_agent_list(self, body):
+        return 200, {"agents": [self._agent_dict(agent) for agent in self.agents.values()]}
+
+    def _agent_dict(self, agent: FakeAgent):
+        return agent.to_dict([c for c in self.channels.values() if c.agent_id == agent.id])
+
+    def _get_agent(self, body, agent_id):
+        try:
+            return 200, self._agent_dict(self.agents[agent_id])
+        except KeyError:
+            return 404, {"detail": "Not found."}
+
+    def _get_channel_messages(self, body, channel_id, num_messages=None):
+        try:
+            messages = self.channels[channel_id].messages
+        except KeyError:
+            return 404, {"detail": "Not found."}
+
+        # newest first, without payloads, as the real listing does
+        messages = messages[::-1]
+        if num_messages:
+            messages = messages[:int(num_messages)]
+        return 200, {"messages": [{k: v for k, v in m.items() if k != "payload"} for m in messages]}
+
+    def _get_channel_message(self, body, channel_id, message_id):
+        try:
+            messages = self.channels[channel_id].messages
+        except KeyError:
+            return 404, {"detail": "Not found."}
+
+        for message in messages:
+            if message["message"] == message_id:
+                return 200, {**message, "payload": json.dumps(message["payload"])}
+        return 404, {"detail": "Not found."}
+
+    def _post_channel_subscribe(self, body, task_id):
+        try:
+            task = self.channels[task_id]
+        except KeyError:
+            return 404, {"detail": "Not found."}
+
+        if body.get("subscribe", True):
+            task.subscriptions.add(body["channel_id"])
+        else:
+            task.subscriptions.discard(body["channel_id"])
+        return 200, True
+
+    def _get_channel(self, body, channel_id):
+        try:
+            return 200, self.channels[channel_id].to_dict()
+        except KeyError:
+            return 404, {"detail": "Not found."}
+
+    def _post_channel(self, body, channel_id):
+        try:
+            channel = self.channels[channel_id]
+        except KeyError:
+            return 404, {"detail": "Not found."}
+        return 200, {"message": self._publish(channel, body or {})["message"]}
+
+    def _post_channel_batch(self, body, channel_id):
+        try:
+            channel = self.channels[channel_id]
+        except KeyError:
+            return 404, {"detail": "Not found."}
+
+        record_log = body.get("record_log", True)
+        ids = [self._publish(channel, {"record_log": record_log, **m})["message"] for m in body["messages"]]
+        return 200, {"messages": ids}
+
+    def _get_channel_named(self, body, agent_id, name):
+        channel = self.get_channel_named(agent_id, name)
+        if channel is None:
+            return 404, {"detail": "Not found."}
+        return 200, channel.to_dict()
+
+    def _post_channel_named(self, body, agent_id, name):
+        channel = self.get_channel_named(agent_id, name)
+        created = channel is None
+        if created:
+            channel = self.create_channel(agent_id, name)
+        if body and body.get("processor_id"):
+            channel.processor_id = body["processor_id"]
+        if created and (not body or body.get("msg") is None):
+            return 200, {"channel": channel.id}
+        return 200, {"message": self._publish(channel, body or {})["message"]}
+
+
+_ROUTE_LIST_AGENTS = re.compile(r"/ch/v1/list_agents/")
+_ROUTE_AGENT = re.compile(r"/ch/v1/agent/([^/]+)/")
+_ROUTE_CHANNEL_MESSAGES = re.compile(r"/ch/v1/channel/([^/]+)/messages/(?:(\d+)/)?")
+_ROUTE_CHANNEL_MESSAGE = re.compile(r"/ch/v1/channel/([^/]+)/message/([^/]+)/?")
+_ROUTE_CHANNEL_SUBSCRIBE = re.compile(r"/ch/v1/channel/([^/]+)/subscribe/")
+_ROUTE_CHANNEL = re.compile(r"/ch/v1/channel/([^/]+)/")
+_ROUTE_CHANNEL_BATCH = re.compile(r"/ch/v1/channel/([^/]+)/batch/")
+_ROUTE_CHANNEL_NAMED = re.compile(r"/ch/v1/agent/([^/]+)/([^/]+)/")
+
+
+def _make_handler(server: FakeDooverServer):
+    class Handler(BaseHTTPRequestHandler):
+        def _dispatch(self, method):
+            length = int(self.headers.get("Content-Length") or 0)
+            if server.max_payload_size is not None and length > server.max_payload_size:
+                return self._respond(413, {"detail": "Payload too large."})
+
+            raw = self.rfile.read(length) if length else b""
+            try:
+                body = json.loads(raw) if raw else None
+            except ValueError:
+                body = raw.decode()
+
+            path = self.path.split("?", 1)[0]
+            status, data = server.handle(method, path, body)
+            self._respond(status, data)
+
+        def _respond(self, status: int, data: Any):
+            payload = json.dumps(data).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            self._dispatch("GET")
+
+        def do_POST(self):
+            self._dispatch("POST")
+
+        def log_message(self, format, *args):
+            log.debug(format, *args)
+
+    return Handler
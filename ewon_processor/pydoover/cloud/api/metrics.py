@@ -0,0 +1,158 @@
+"""
+Per-route request metrics, fed from the request hooks on `Client` and `pydatamailbox` `EwonClient`.
+
+    metrics = RequestMetrics()
+    metrics.install(client, ewon_client)
+    ...
+    print(metrics.to_json())
+    print(metrics.to_prometheus())
+"""
+
+import json
+import math
+import threading
+
+from typing import Any, Optional
+
+# latency bucket upper bounds in seconds, from 1ms doubling every two buckets up to ~65s
+LATENCY_BUCKETS = tuple(round(0.001 * math.sqrt(2) ** i, 6) for i in range(33))
+
+
+class LatencyHistogram:
+    """A fixed-bucket latency histogram. Quantiles are estimated by interpolating within a bucket."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / count, self.max)
+            seen += count
+        return self.max
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.retries = 0
+        self.statuses: dict[str, int] = dict()
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.latency.count,
+            "p50": self.latency.quantile(0.5),
+            "p95": self.latency.quantile(0.95),
+            "p99": self.latency.quantile(0.99),
+            "mean": self.latency.sum / self.latency.count if self.latency.count else None,
+            "max": self.latency.max,
+            "request_bytes": self.request_bytes,
+            "response_bytes": self.response_bytes,
+            "retries": self.retries,
+            "statuses": self.statuses,
+        }
+
+
+class RequestMetrics:
+    """Aggregates finished requests by client, method and route template.
+
+    Instances are callable with a request event, so they can be appended to any `after_request_hooks` list directly.
+    """
+
+    def __init__(self):
+        self.routes: dict[tuple[str, str, str], RouteMetrics] = dict()
+        self._lock = threading.Lock()
+
+    def install(self, *clients):
+        for client in clients:
+            if self not in client.after_request_hooks:
+                client.after_request_hooks.append(self)
+        return self
+
+    def __call__(self, event: dict[str, Any]):
+        key = (event.get("client", ""), event["method"], event["route"])
+        with self._lock:
+            try:
+                metrics = self.routes[key]
+            except KeyError:
+                metrics = self.routes[key] = RouteMetrics()
+
+            metrics.latency.observe(event["latency"])
+            metrics.request_bytes += event.get("request_bytes", 0)
+            metrics.response_bytes += event.get("response_bytes", 0)
+            metrics.retries += event.get("retries", 0)
+            status = str(event.get("status"))
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self.routes.clear()
+
+    def to_dict(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return [
+                {"client": client, "method": method, "route": route, **metrics.to_dict()}
+                for (client, method, route), metrics in self.routes.items()
+            ]
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def to_prometheus(self, prefix: str = "http_client") -> str:
+        """Export in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {prefix}_request_duration_seconds Request latency, including retries.",
+            f"# TYPE {prefix}_request_duration_seconds histogram",
+        ]
+        counters = []
+        with self._lock:
+            for (client, method, route), metrics in self.routes.items():
+                labels = f'client="{_escape(client)}",method="{method}",route="{_escape(route)}"'
+                histogram = metrics.latency
+
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + ("+Inf", ), histogram.counts):
+                    cumulative += count
+                    lines.append(f'{prefix}_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"{prefix}_request_duration_seconds_sum{{{labels}}} {histogram.sum}")
+                lines.append(f"{prefix}_request_duration_seconds_count{{{labels}}} {histogram.count}")
+
+                counters.append(("request_bytes_total", labels, metrics.request_bytes))
+                counters.append(("response_bytes_total", labels, metrics.response_bytes))
+                counters.append(("retries_total", labels, metrics.retries))
+                for status, count in metrics.statuses.items():
+                    counters.append(("responses_total", f'{labels},status="{status}"', count))
+
+        for name in ("request_bytes_total", "response_bytes_total", "retries_total", "responses_total"):
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            lines.extend(f"{prefix}_{name}{{{labels}}} {value}" for n, labels, value in counters if n == name)
+
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
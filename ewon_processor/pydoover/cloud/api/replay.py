@@ -0,0 +1,197 @@
+"""
+Record real HTTP traffic to a compact corpus on disk, and replay it offline.
+
+The adapters work at the `requests` transport level, so they can be mounted on any session -
+`Client.session` as well as `pydatamailbox` `EwonClient.session`:
+
+    recorder = record("incident.jsonl.gz", client.session, ewon_client.session)
+    ... run as normal ...
+    recorder.close()
+
+    replay("incident.jsonl.gz", client.session, ewon_client.session, time_scale=0)
+
+Requests are matched by method and path (ignoring the host), and each match is answered with the next recorded
+response for it in order, so a replay of the same sequence of calls is deterministic.
+Credentials are never written: request headers aren't recorded, and request bodies are only stored as a hash
+with the known credential fields removed.
+"""
+
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from collections import defaultdict, deque
+from typing import Optional
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+
+log = logging.getLogger(__name__)
+
+# request body fields that hold credentials, and are left out of the recorded body hash
+SENSITIVE_FIELDS = {"t2mtoken", "t2mpassword", "t2musername", "t2maccount", "t2mdevid", "token", "password"}
+
+
+def _request_key(request: requests.PreparedRequest) -> str:
+    url = urlsplit(request.url)
+    path = url.path + ("?" + url.query if url.query else "")
+    return f"{request.method} {path}"
+
+
+def _body_hash(request: requests.PreparedRequest) -> Optional[str]:
+    body = request.body
+    if not body:
+        return None
+    if isinstance(body, str):
+        body = body.encode()
+
+    content_type = request.headers.get("Content-Type", "")
+    if "x-www-form-urlencoded" in content_type:
+        fields = sorted((k, v) for k, v in parse_qsl(body.decode()) if k not in SENSITIVE_FIELDS)
+        body = json.dumps(fields).encode()
+
+    return hashlib.sha1(body).hexdigest()
+
+
+def _mount(adapter: BaseAdapter, sessions):
+    for session in sessions:
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+    return adapter
+
+
+class RecordingAdapter(BaseAdapter):
+    """Passes requests through to a real adapter, and appends each request / response pair to a gzipped JSON lines file.
+
+    One adapter can be mounted on several sessions to record them all into the same corpus.
+    Responses are read in full before being returned, so streamed responses are buffered while recording.
+    """
+
+    def __init__(self, path: str, adapter: Optional[BaseAdapter] = None):
+        super().__init__()
+        self.path = path
+        self.adapter = adapter or HTTPAdapter()
+
+        self._file = gzip.open(path, "wt", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+
+    def send(self, request, **kwargs):
+        started = time.monotonic()
+        response = self.adapter.send(request, **kwargs)
+        content = response.content
+        elapsed = time.monotonic() - started
+
+        try:
+            body, encoding = content.decode("utf-8"), None
+        except UnicodeDecodeError:
+            body, encoding = base64.b64encode(content).decode(), "base64"
+
+        entry = {
+            "key": _request_key(request),
+            "body_hash": _body_hash(request),
+            "at": round(started - self._started, 4),
+            "elapsed": round(elapsed, 4),
+            "status": response.status_code,
+            "content_type": response.headers.get("Content-Type"),
+            "body": body,
+        }
+        if encoding:
+            entry["encoding"] = encoding
+
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        return response
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+        self.adapter.close()
+
+
+class ReplayAdapter(BaseAdapter):
+    """Answers requests from a corpus written by `RecordingAdapter`, without touching the network.
+
+    Parameters
+    ----------
+    path: str
+        Corpus to replay.
+    time_scale: float
+        Each response is delayed by its recorded latency multiplied by this. 0 (the default) replays as fast as possible,
+        1 in real time.
+    match_body: bool
+        Also match on the (credential-free) request body, not just the method and path.
+        Leave this off when bodies contain timestamps that change from run to run.
+    """
+
+    def __init__(self, path: str, time_scale: float = 0, match_body: bool = False):
+        super().__init__()
+        self.path = path
+        self.time_scale = time_scale
+        self.match_body = match_body
+
+        self._lock = threading.Lock()
+        self._entries: dict[tuple, deque] = defaultdict(deque)
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                self._entries[self._entry_key(entry["key"], entry["body_hash"])].append(entry)
+
+    def _entry_key(self, key, body_hash):
+        return (key, body_hash) if self.match_body else (key, )
+
+    @property
+    def remaining(self) -> int:
+        """Number of recorded responses that haven't been replayed yet."""
+        return sum(len(entries) for entries in self._entries.values())
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        key = _request_key(request)
+        with self._lock:
+            entries = self._entries.get(self._entry_key(key, _body_hash(request)))
+            if not entries:
+                raise requests.exceptions.ConnectionError(f"No recorded response left for {key}", request=request)
+            entry = entries.popleft()
+
+        if self.time_scale:
+            time.sleep(entry["elapsed"] * self.time_scale)
+
+        content = entry["body"].encode("utf-8")
+        if entry.get("encoding") == "base64":
+            content = base64.b64decode(content)
+
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.headers = CaseInsensitiveDict({"Content-Length": str(len(content))})
+        if entry.get("content_type"):
+            response.headers["Content-Type"] = entry["content_type"]
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.reason = "Replayed"
+        response._content = content
+        response._content_consumed = True
+        return response
+
+    def close(self):
+        pass
+
+
+def record(path: str, *sessions: requests.Session, adapter: Optional[BaseAdapter] = None) -> RecordingAdapter:
+    """Record every request made through `sessions` to the corpus at `path`. Close the returned adapter to finish writing."""
+    return _mount(RecordingAdapter(path, adapter), sessions)
+
+
+def replay(path: str, *sessions: requests.Session, time_scale: float = 0, match_body: bool = False) -> ReplayAdapter:
+    """Answer every request made through `sessions` from the corpus at `path`."""
+    return _mount(ReplayAdapter(path, time_scale, match_body), sessions)
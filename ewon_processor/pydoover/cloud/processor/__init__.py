@@ -1 +1,2 @@
 from .base import ProcessorBase
+from .spans import Span, Tracer
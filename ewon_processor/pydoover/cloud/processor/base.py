@@ -7,40 +7,37 @@ In the doover_config.json file we have defined some of these subscriptions
 These are under 'processor_deployments' > 'tasks'
 """
 
+import json
 import logging
 import sys
 import time
 
 from typing import Any
 
+import requests
+
 from ...cloud.api import Client, Message
 
 from ...ui import UIManager
+from .logs import LogHandler
+from .spans import Tracer
 
 # use the root logger since we want to pipe these logs to a channel.
 log = logging.getLogger()
 
-
-class LogHandler(logging.NullHandler):
-    def __init__(self, *args, **kwargs):
-        self.logs = []
-        super().__init__(*args, **kwargs)
-
-    def handle(self, record):
-        if record.levelno < self.level:
-            return
-
-        fmt = self.format(record)
-        self.logs.append(fmt)
-
-    def emit(self, record):
-        self.handle(record)
-
-    def get_logs(self):
-        return "\n".join(self.logs)
+# kept between invocations in a warm container, when `ProcessorBase.warm_reuse` is on.
+_session_pool: dict[str, requests.Session] = dict()
+_warm_state: dict[str, dict[str, Any]] = dict()
 
 
 class ProcessorBase:
+    # Opt-in (here, or with `warm_reuse` in the package config) to reuse state between invocations in a warm container:
+    # HTTP sessions (and their open connections) are pooled, the UIManager and its element tree are kept per agent,
+    # and loaded modules aren't torn down between runs.
+    warm_reuse: bool = False
+    # loggers switched to debug level in trace mode. The root logger stays at INFO, so other libraries stay quiet.
+    trace_loggers: tuple[str, ...] = ("pydoover", "pydatamailbox")
+
     def __init__(self, **kwargs):
 
         self.agent_id: str = kwargs["agent_id"]
@@ -48,12 +45,50 @@ class ProcessorBase:
         self.log_channel_id: str = kwargs["log_channel"]
         self.task_id: str = kwargs["task_id"]
 
-        self.api: Client = Client(token=self.access_token, base_url=kwargs["api_endpoint"])
-        self.ui_manager: UIManager = UIManager(self.agent_id, self.api)
-        
-        self._log_handler = LogHandler()
+        self.warm_reuse = (kwargs.get("package_config") or {}).get("warm_reuse", self.warm_reuse)
+        # state for this agent that is kept between warm invocations. Always empty if warm_reuse is off.
+        self.warm_state: dict[str, Any] = _warm_state.setdefault(self.agent_id, dict()) if self.warm_reuse else dict()
+
+        self.api: Client = Client(token=self.access_token, base_url=kwargs["api_endpoint"], session=self.get_session("doover"))
+
+        # set if the UIManager (and so its element tree) was kept from a previous invocation
+        self.ui_manager_reused = "ui_manager" in self.warm_state
+        if self.ui_manager_reused:
+            self.ui_manager: UIManager = self.warm_state["ui_manager"]
+            self.ui_manager.client = self.api
+            # the cloud state may have changed since the last run
+            self.ui_manager.invalidate_shadow_state()
+        else:
+            self.ui_manager: UIManager = UIManager(self.agent_id, self.api)
+            if self.warm_reuse:
+                self.warm_state["ui_manager"] = self.ui_manager
+
+        # times each phase of the run, along with the HTTP calls made during it. See `span`.
+        self.tracer = Tracer()
+        self.tracer.instrument_session(self.api.session)
+
+        # make sure only this invocation's handler is collecting logs
+        for handler in list(log.handlers):
+            if getattr(handler, "is_processor_log_handler", False):
+                log.removeHandler(handler)
+                handler.close()
+
+        # logs are shipped in batches as the run goes, on their own session so they don't hold up (or count towards) the run's requests.
+        # Tune with eg. `"log_shipping": {"capacity": 5000, "batch_size": 500, "interval": 5, "compress_threshold": 65536}`.
+        self._log_client: Client = Client(token=self.access_token, base_url=kwargs["api_endpoint"], session=self.get_session("doover_logs"))
+        self._log_handler = LogHandler(
+            publish=self._publish_logs if self.log_channel_id is not None else None,
+            **(kwargs.get("package_config") or {}).get("log_shipping", {}),
+        )
+        self._log_handler.start()
         log.addHandler(self._log_handler)
         log.setLevel(level=logging.INFO)
+        # `"trace": true` in the package config turns on debug logging (request and response bodies, UI diffs, each frame)
+        # from `trace_loggers` for this invocation only. It's off by default since those messages are large and frequent.
+        self.trace: bool = bool((kwargs.get("package_config") or {}).get("trace", False))
+        for name in self.trace_loggers:
+            # NOTSET rather than INFO, so a warm container doesn't keep the last invocation's level
+            logging.getLogger(name).setLevel(logging.DEBUG if self.trace else logging.NOTSET)
 
         self.agent_id: str = kwargs["agent_id"]
         self.log_channel_id: str = kwargs["log_channel"]
@@ -81,40 +116,64 @@ class ProcessorBase:
         #       'deployment_config' : {} # a dictionary of the deployment config for this agent
         #     }
 
+    def get_session(self, name: str) -> requests.Session:
+        """A requests session for `name` (eg. "doover"), which is pooled between invocations if warm_reuse is on."""
+        if not self.warm_reuse:
+            return requests.Session()
+        try:
+            return _session_pool[name]
+        except KeyError:
+            session = _session_pool[name] = requests.Session()
+            return session
+
+    def _publish_logs(self, payload):
+        self._log_client.publish_to_channel(self.log_channel_id, payload)
+
     def setup(self):
         return NotImplemented
 
     def close(self):
         return NotImplemented
 
+    def span(self, name: str, **attributes):
+        """Time a phase of the run, eg. `with self.span("push"): ...`. Spans can be nested."""
+        return self.tracer.span(name, **attributes)
+
     def execute(self):
         """This function is invoked after the singleton instance is created."""
         start_time = time.time()
         log.info(f"Initialising processor task for task channel {self.task_id}")
         log.info(f"Started at {start_time}.")
 
-        try:
-            self.import_modules()
-            self.setup()
-
+        with self.span("execute"):
             try:
-                self.process()
-            except Exception as e:
-                log.error(f"ERROR attempting to process message: {e} ", exc_info=e)
+                with self.span("setup"):
+                    if not self.warm_reuse:
+                        self.import_modules()
+                    self.setup()
 
-        except Exception as e:
-            log.error(f"ERROR attempting to initialise process: {e}", exc_info=e)
+                try:
+                    with self.span("process"):
+                        self.process()
+                except Exception as e:
+                    log.error(f"ERROR attempting to process message: {e} ", exc_info=e)
 
-        try:
-            self.close()
-        except Exception as e:
-            log.error(f"ERROR attempting to close process: {e} ", exc_info=e)
+            except Exception as e:
+                log.error(f"ERROR attempting to initialise process: {e}", exc_info=e)
+
+            try:
+                with self.span("close"):
+                    self.close()
+            except Exception as e:
+                log.error(f"ERROR attempting to close process: {e} ", exc_info=e)
 
         end_time = time.time()
         log.info(f"Finished at {end_time}. Process took {end_time - start_time} seconds.")
+        log.info(f"Timing summary: {json.dumps(self.tracer.summary())}")
 
-        if self._log_handler.get_logs() and self.log_channel_id is not None:
-            self.api.publish_to_channel(self.log_channel_id, self._log_handler.get_logs())
+        # stops the shipping thread and publishes whatever is left
+        log.removeHandler(self._log_handler)
+        self._log_handler.close()
 
     def process(self):
         return NotImplemented
@@ -0,0 +1,135 @@
+import base64
+import collections
+import gzip
+import logging
+import sys
+import threading
+
+from typing import Any, Callable, Optional
+
+
+class LogHandler(logging.Handler):
+    """Keeps formatted records in a bounded ring buffer, and ships them in batches from a background thread.
+
+    Without a `publish` function records are only kept (the newest `capacity` of them) for `get_logs`.
+    With one, call `start` and a batch is published whenever `batch_size` records are waiting or `interval` seconds
+    have passed, so logs reach the channel while the run is still going. `close` stops the thread and ships the rest.
+
+    If records come in faster than they can be shipped the oldest are dropped (as are batches that fail to publish),
+    and the next batch notes how many.
+    Batches over `compress_threshold` bytes are published as `{"encoding": "gzip+base64", "data": "..."}`.
+    """
+
+    # checked by name rather than isinstance, since the class is re-created if pydoover is re-imported
+    is_processor_log_handler = True
+
+    def __init__(
+        self,
+        level: int = logging.NOTSET,
+        publish: Optional[Callable[[Any], Any]] = None,
+        capacity: int = 5000,
+        batch_size: int = 500,
+        interval: float = 5.0,
+        compress_threshold: Optional[int] = None,
+    ):
+        super().__init__(level)
+        self.publish = publish
+        self.batch_size = batch_size
+        self.interval = interval
+        self.compress_threshold = compress_threshold
+
+        self._buffer: collections.deque[str] = collections.deque(maxlen=capacity)
+        self._dropped = 0
+        self._closing = False
+        self._thread: Optional[threading.Thread] = None
+        self._cond = threading.Condition()
+        # held while publishing, so batches from the thread and from `flush` go out in order
+        self._flush_lock = threading.Lock()
+        # set on whichever thread is publishing. Records logged while publishing (eg. the client's debug logs of the
+        # request, which contain the batch itself) are dropped, otherwise each flush would ship the last one again.
+        self._publishing = threading.local()
+
+    def emit(self, record):
+        if getattr(self._publishing, "active", False):
+            return
+
+        try:
+            fmt = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+
+        with self._cond:
+            if len(self._buffer) == self._buffer.maxlen:
+                self._dropped += 1
+            self._buffer.append(fmt)
+            if self.publish is not None and len(self._buffer) >= self.batch_size:
+                self._cond.notify()
+
+    def get_logs(self) -> str:
+        """The records that haven't been shipped yet."""
+        with self._cond:
+            return "\n".join(self._buffer)
+
+    def start(self):
+        if self.publish is None or self._thread is not None:
+            return
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, name="processor-log-shipper", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closing or len(self._buffer) >= self.batch_size, timeout=self.interval)
+                if self._closing:
+                    return
+            self.flush()
+
+    def flush(self):
+        if self.publish is None:
+            return
+
+        with self._flush_lock:
+            with self._cond:
+                records = list(self._buffer)
+                self._buffer.clear()
+                dropped, self._dropped = self._dropped, 0
+
+            if dropped:
+                records.insert(0, f"... {dropped} log records were dropped")
+
+            self._publishing.active = True
+            try:
+                for i in range(0, len(records), self.batch_size):
+                    batch = records[i:i + self.batch_size]
+                    try:
+                        self.publish(self._encode(batch))
+                    except Exception as e:
+                        with self._cond:
+                            self._dropped += len(batch)
+                        # not logged, since that would be dropped anyway
+                        sys.stderr.write(f"Failed to publish {len(batch)} log records: {e}\n")
+            finally:
+                self._publishing.active = False
+
+    def _encode(self, records: list[str]) -> Any:
+        text = "\n".join(records)
+        if self.compress_threshold is None:
+            return text
+
+        data = text.encode()
+        if len(data) <= self.compress_threshold:
+            return text
+        return {"encoding": "gzip+base64", "data": base64.b64encode(gzip.compress(data)).decode()}
+
+    def close(self):
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        self.flush()
+        super().close()
@@ -0,0 +1,144 @@
+import threading
+import time
+
+from contextlib import contextmanager
+from typing import Any, Optional
+
+import requests
+
+
+class Span:
+    """A named, timed section of a processor run, with the HTTP traffic made while it was open.
+
+    HTTP counts include traffic from any nested spans.
+    """
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, **attributes):
+        self.name = name
+        self.parent = parent
+        self.attributes = attributes
+        self.children: list["Span"] = []
+
+        self.start = time.perf_counter()
+        self.end = None
+
+        self.http_calls = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "duration": round(self.duration, 4),
+            "http_calls": self.http_calls,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            **({"attributes": self.attributes} if self.attributes else {}),
+            "children": [c.to_dict() for c in self.children],
+        }
+
+
+class Tracer:
+    """Records a tree of spans for a processor run.
+
+    Use `span` as a context manager to time a phase; spans opened inside it are nested under it.
+    Each thread keeps its own stack of open spans, and threads without one (eg. worker pools) report into
+    the innermost span of the thread that created the tracer.
+
+        with tracer.span("syncdata", page=1):
+            ...
+
+    Sessions passed to `instrument_session` count their requests and bytes against the span open at the time.
+    """
+
+    def __init__(self):
+        self.root: Optional[Span] = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._main_stack = self._stack
+
+    @property
+    def _stack(self) -> list[Span]:
+        try:
+            return self._local.stack
+        except AttributeError:
+            self._local.stack = []
+            return self._local.stack
+
+    @property
+    def current(self) -> Optional[Span]:
+        stack = self._stack or self._main_stack
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        parent = self.current
+        span = Span(name, parent, **attributes)
+        with self._lock:
+            if parent is None:
+                if self.root is None:
+                    self.root = span
+                else:
+                    self.root.children.append(span)
+                    span.parent = self.root
+            else:
+                parent.children.append(span)
+
+        self._stack.append(span)
+        try:
+            yield span
+        finally:
+            span.end = time.perf_counter()
+            self._stack.pop()
+
+    def record_http(self, bytes_sent: int = 0, bytes_received: int = 0):
+        span = self.current
+        with self._lock:
+            while span is not None:
+                span.http_calls += 1
+                span.bytes_sent += bytes_sent
+                span.bytes_received += bytes_received
+                span = span.parent
+
+    def _on_response(self, response: requests.Response, *args, stream: bool = False, **kwargs):
+        body = response.request.body if response.request is not None else None
+        if stream:
+            # don't read a streamed body here, since the caller hasn't consumed it yet
+            received = int(response.headers.get("Content-Length") or 0)
+        else:
+            received = len(response.content or b"")
+        self.record_http(len(body or b""), received)
+
+    def instrument_session(self, session: requests.Session):
+        """Count every request made through `session` against the current span."""
+        hooks = session.hooks.setdefault("response", [])
+        # pooled sessions may still have the hook of a tracer from a previous run
+        hooks[:] = [h for h in hooks if getattr(h, "__func__", None) is not Tracer._on_response]
+        hooks.append(self._on_response)
+
+    def summary(self) -> dict[str, Any]:
+        """The span tree, with repeated spans of the same name under one parent (eg. one per page) merged together."""
+        if self.root is None:
+            return {}
+        return _merge([self.root])
+
+
+def _merge(spans: list[Span]) -> dict[str, Any]:
+    by_name: dict[str, list[Span]] = {}
+    for span in spans:
+        for child in span.children:
+            by_name.setdefault(child.name, []).append(child)
+
+    return {
+        "name": spans[0].name,
+        "count": len(spans),
+        "duration": round(sum(s.duration for s in spans), 4),
+        "http_calls": sum(s.http_calls for s in spans),
+        "bytes_sent": sum(s.bytes_sent for s in spans),
+        "bytes_received": sum(s.bytes_received for s in spans),
+        "children": [_merge(children) for children in by_name.values()],
+    }
@@ -9,6 +9,12 @@ from .misc import Colour
 class Element:
     type = "uiElement"
 
+    # Dirty tracking, so a diff only visits what has changed since the tree was last synced with the cloud state.
+    # Setting a public attribute marks an element dirty, and its parent containers as having a dirty child.
+    _dirty: bool = True
+    # the cloud state dict this element was last synced with, see `_mark_synced`
+    _synced: Optional[dict[str, Any]] = None
+
     def __init__(
         self,
         name: Optional[str],
@@ -36,6 +42,40 @@ class Element:
         self.component_url = component_url
         self.position = position
 
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        # properties (eg. `current_value`) mark the element dirty themselves, and only if the value changed
+        if not name.startswith("_") and not hasattr(getattr(type(self), name, None), "__set__"):
+            self.mark_dirty()
+
+    def mark_dirty(self):
+        """Mark this element as changed since the last push.
+
+        This is done automatically when an attribute is set, but changes made in-place (eg. to a list attribute) need to call it.
+        """
+        self._dirty = True
+        self._propagate_dirty()
+
+    def _propagate_dirty(self):
+        element, parent = self, getattr(self, "parent", None)
+        while parent is not None:
+            dirty_children = parent.__dict__.get("_dirty_children")
+            name = element.name.strip()
+            if dirty_children is None or name in dirty_children:
+                # parents already know about this subtree
+                break
+            dirty_children.add(name)
+            element, parent = parent, getattr(parent, "parent", None)
+
+    def _mark_synced(self, state: dict[str, Any]) -> bool:
+        """Record that the cloud state for this element, `state`, now matches it (ie. a diff has been applied to it).
+
+        Returns whether the whole subtree could be synced.
+        """
+        self._synced = state
+        self._dirty = False
+        return True
+
     def to_dict(self):
         to_return = {
             "name": self.name,
@@ -55,6 +95,9 @@ class Element:
         return {k: v for k, v in to_return.items() if v is not None}
 
     def get_diff(self, other: dict[str, Any], remove: bool = True, retain_fields: Optional[list] = []) -> Optional[dict[str, Any]]:
+        if not self._dirty and other is self._synced and not retain_fields:
+            return None
+
         this = self.to_dict()
         # if this == other:
         #     return None
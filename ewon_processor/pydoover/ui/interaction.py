@@ -35,7 +35,7 @@ class Interaction(Element):
             self.transform_check = transform_check
 
         if self._current_value in (None, NotSet) and self._default_value is not None:
-            print(f"Coercing {self.name} to default value {self._default_value}")
+            log.debug("Coercing %s to default value %s", self.name, self._default_value)
             self.coerce(self._default_value)
 
         self.show_activity = show_activity
@@ -49,7 +49,11 @@ class Interaction(Element):
         ## Store all datetime objects as epoch seconds internally
         if isinstance(new_val, datetime):
             new_val = int(new_val.timestamp())
+
+        if type(new_val) is type(self._current_value) and new_val == self._current_value:
+            return
         self._current_value = new_val
+        self.mark_dirty()
 
     def _json_safe_current_value(self):
         result = self.current_value
@@ -6,7 +6,7 @@ import time
 import json
 from datetime import datetime
 
-from typing import Union, Any, Optional, TypeVar, TYPE_CHECKING
+from typing import Union, Any, Optional, TypeVar, Iterable, TYPE_CHECKING
 
 from .element import Element
 from .interaction import SlimCommand, Interaction, NotSet
@@ -14,6 +14,7 @@ from .submodule import Container, NAME_VALIDATOR
 from .variable import Variable
 
 from ..cloud.api import Client
+from ..utils import apply_diff
 
 if TYPE_CHECKING:
     from ..docker.device_agent.device_agent import device_agent_iface
@@ -38,6 +39,7 @@ class UIManager:
         auto_start: bool = False,
         min_ui_update_period: int = 600,
         min_observed_update_period: int = 4,
+        shadow_state: bool = False,
     ):
         self.client = client
         # to determine whether we can use event-based logic
@@ -66,6 +68,11 @@ class UIManager:
         self.min_observed_update_period = min_observed_update_period
         self._last_pushed_time = None
 
+        # when using an HTTP client, shadow state mode pulls once and then applies each published diff to
+        # last_ui_state / last_ui_cmds locally, rather than re-pulling both channels before every push.
+        self.shadow_state = shadow_state
+        self._shadow_state_stale = True
+
         # legacy, list of subscriptions to call when we have a command update.
         self._cmds_subscriptions = []
 
@@ -317,17 +324,34 @@ class UIManager:
     def _publish_to_channel(self, channel_name: str, data: dict[str, Any], record_log: bool = True, timestamp: Optional[datetime] = None, **kwargs):
         # this purely exists to provide cross-compatibility between clients (hence private method).
         if isinstance(self.client, Client):
-            channel = self.client.get_channel_named(channel_name, self.agent_id)
-            return channel.publish(data, save_log=record_log, timestamp=timestamp, **kwargs)
+            try:
+                channel = self.client.get_channel_named(channel_name, self.agent_id)
+                return channel.publish(data, save_log=record_log, timestamp=timestamp, **kwargs)
+            except Exception:
+                # we don't know what made it upstream, so our shadow copy can't be trusted anymore.
+                # the cached channel may also be out of date (eg. if it's been deleted and recreated).
+                self.invalidate_shadow_state()
+                self.client.invalidate_channel_cache(channel_name, self.agent_id)
+                raise
         else:
             # fixme: allow for timestamp in DDA message publishing...
             return self.client.publish_to_channel(channel_name, data, record_log=record_log, **kwargs)
 
+    def _publish_many_to_channel(self, channel_name: str, records: list[tuple[Optional[datetime], dict[str, Any]]], record_log: bool = True, max_payload_size: Optional[int] = None):
+        try:
+            channel = self.client.get_channel_named(channel_name, self.agent_id)
+            return channel.publish_many(records, save_log=record_log, max_payload_size=max_payload_size)
+        except Exception:
+            self.invalidate_shadow_state()
+            self.client.invalidate_channel_cache(channel_name, self.agent_id)
+            raise
+
     def pull(self):
-        print("pulling...")
+        log.debug("Pulling UI state and commands")
         if isinstance(self.client, Client):
-            ui_cmds = self.client.get_channel_named("ui_cmds", self.agent_id)
-            ui_state = self.client.get_channel_named("ui_state", self.agent_id)
+            # skip the channel cache, since we want the latest aggregates.
+            ui_cmds = self.client.get_channel_named("ui_cmds", self.agent_id, use_cache=False)
+            ui_state = self.client.get_channel_named("ui_state", self.agent_id, use_cache=False)
 
             ui_cmds_agg = ui_cmds.fetch_aggregate()
             ui_state_agg = ui_state.fetch_aggregate()
@@ -339,6 +363,26 @@ class UIManager:
         
         # self._set_new_ui_cmds(ui_cmds_agg)
         self.on_command_update(None, ui_cmds_agg)
+        self._shadow_state_stale = False
+
+    refresh = pull
+
+    def invalidate_shadow_state(self):
+        """Force the next HTTP push to re-pull ui_state and ui_cmds, even in shadow state mode."""
+        self._shadow_state_stale = True
+
+    def _apply_to_shadow_state(self, commands_update: Optional[dict[str, Any]], ui_state_update: Optional[dict[str, Any]]):
+        if commands_update:
+            if not isinstance(self.last_ui_cmds, dict):
+                self.last_ui_cmds = {}
+            apply_diff(self.last_ui_cmds, commands_update)
+            self.last_ui_cmds_update = time.time()
+
+        if ui_state_update:
+            if not isinstance(self.last_ui_state, dict):
+                self.last_ui_state = {}
+            apply_diff(self.last_ui_state, ui_state_update["state"])
+            self.last_ui_state_update = time.time()
 
     def push(self,
             record_log: bool = True,
@@ -364,16 +408,18 @@ class UIManager:
             elif self.last_ui_cmds_update is None:
                 log.warning("Waiting for UI commands to be pulled before pushing...")
                 return False
-        else:
+        elif not self.shadow_state or self._shadow_state_stale:
             self.pull()  # do a pull before HTTP client pushes anything...
 
-        print("pushing...")
+        log.debug("Pushing UI state and commands")
         commands_update = self._get_commands_update(publish_fields=publish_fields)
         if commands_update is not None:
             ui_cmds_msg = {"cmds": commands_update}
 
             if only_channels is None or "ui_cmds" in only_channels:
                 self._publish_to_channel("ui_cmds", ui_cmds_msg, timestamp=timestamp)
+            else:
+                commands_update = None  # wasn't published, so don't apply it to the shadow state
 
         ui_state_update = self._get_ui_state_update(should_remove=should_remove, retain_fields=publish_fields)
         if ui_state_update is not None:
@@ -381,10 +427,72 @@ class UIManager:
                 self._publish_to_channel("ui_state", ui_state_update, record_log=record_log, timestamp=timestamp)
         elif even_if_empty:
             if only_channels is None or "ui_state" in only_channels:
-                print("pushing empty ui state")
+                log.debug("Pushing empty UI state")
                 self._publish_to_channel("ui_state", {}, record_log=record_log, timestamp=timestamp)
         else:
-            print("not pushing empty ui state")
+            log.debug("Not pushing empty UI state")
+
+        if self.shadow_state and not self._has_persistent_connection:
+            if ui_state_update is not None and not (only_channels is None or "ui_state" in only_channels):
+                ui_state_update = None
+            self._apply_to_shadow_state(commands_update, ui_state_update)
+            if (only_channels is None or "ui_state" in only_channels) and isinstance(self.last_ui_state, dict):
+                # the next diff only needs to visit elements that change from here
+                self._base_container._mark_synced(self.last_ui_state)
+
+        self._last_pushed_time = time.time()
+        self._has_critical_interaction_pending = False
+        return True
+
+    def push_many(self,
+            frames: Iterable[tuple[Optional[datetime], dict[str, Any]]],
+            record_log: bool = True,
+            should_remove: bool = True,
+            even_if_empty: bool = False,
+            max_payload_size: Optional[int] = None,
+        ) -> bool:
+        """Push an ordered sequence of (timestamp, {variable_name: value}) frames as timestamped ui_state records.
+
+        Each frame's variable values are applied in turn and diffed against the state left by the previous frame,
+        then all the resulting records are published in as few requests as the client allows.
+        Any commands update is published once, before the frames.
+        """
+        if not isinstance(self.client, Client):
+            # persistent connections don't support batched publishing, so push each frame in turn.
+            for timestamp, values in frames:
+                for name, value in values.items():
+                    self.update_variable(name, value)
+                self.push(record_log=record_log, should_remove=should_remove, timestamp=timestamp, even_if_empty=even_if_empty)
+            return True
+
+        if not self.shadow_state or self._shadow_state_stale:
+            self.pull()
+
+        commands_update = self._get_commands_update()
+        if commands_update is not None:
+            self._publish_to_channel("ui_cmds", {"cmds": commands_update})
+            self._apply_to_shadow_state(commands_update, None)
+
+        if not isinstance(self.last_ui_state, dict):
+            self.last_ui_state = {}
+
+        records = []
+        for timestamp, values in frames:
+            for name, value in values.items():
+                self.update_variable(name, value)
+
+            ui_state_update = self._get_ui_state_update(should_remove=should_remove)
+            if ui_state_update is not None:
+                records.append((timestamp, ui_state_update))
+                # the next frame is diffed against this one, regardless of whether shadow state is in use.
+                apply_diff(self.last_ui_state, ui_state_update["state"])
+            elif even_if_empty:
+                records.append((timestamp, {}))
+            self._base_container._mark_synced(self.last_ui_state)
+
+        if records:
+            self._publish_many_to_channel("ui_state", records, record_log=record_log, max_payload_size=max_payload_size)
+            self.last_ui_state_update = time.time()
 
         self._last_pushed_time = time.time()
         self._has_critical_interaction_pending = False
@@ -406,9 +514,9 @@ class UIManager:
             or name in publish_fields
         }
 
-        log.debug("Last Commands: " + str(cloud_commands))
-        log.debug("New Commands: " + str(local_commands))
-        log.debug("Commands Update: " + str(result))
+        log.debug("Last Commands: %s", cloud_commands)
+        log.debug("New Commands: %s", local_commands)
+        log.debug("Commands Update: %s", result)
 
         # don't clean up commands that exist upstream but not locally for now.
         result.update({c: None for c in cloud_commands.keys() if c not in local_commands})
@@ -422,9 +530,11 @@ class UIManager:
         # this recursively evaluates and finds the diff on all children, rather than trying to do the diff here
         result = self._base_container.get_diff(cloud_state, remove=should_remove, retain_fields=retain_fields)
 
-        log.debug("Last UI State: " + str(cloud_state))
-        log.debug("New UI State: " + str(self._base_container.to_dict()))
-        log.debug("UI State Update: " + str(result))
+        log.debug("Last UI State: %s", cloud_state)
+        if log.isEnabledFor(logging.DEBUG):
+            # serialising the whole tree again is expensive, so only do it when it'll be logged
+            log.debug("New UI State: %s", self._base_container.to_dict())
+        log.debug("UI State Update: %s", result)
 
         if not result or len(result) == 0:
             return None
@@ -73,7 +73,11 @@ class DateTimeParameter(Parameter):
     def current_value(self, new_val):
         if isinstance(new_val, datetime):
             new_val = int(new_val.timestamp())
+
+        if type(new_val) is type(self._current_value) and new_val == self._current_value:
+            return
         self._current_value = new_val
+        self.mark_dirty()
 
     def to_dict(self):
         result = super().to_dict()
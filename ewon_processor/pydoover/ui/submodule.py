@@ -1,6 +1,6 @@
 import inspect
 import re
-from typing import Any, Optional
+from typing import Any, Iterable, Optional
 
 from .element import Element
 
@@ -14,8 +14,13 @@ class Container(Element):
     def __init__(self, name, display_name=None, children: list[Element] = None, status_icon: str = None, auto_add_elements: bool = True, **kwargs):
         super().__init__(name, display_name, **kwargs)
 
+        # names of children that have changed (or been added or removed) since this container was last synced
+        self._dirty_children: set[str] = set()
         # A list of doover_ui_elements
         self._children = dict()
+        # every element in this subtree by name, so `get_element` doesn't have to search for it.
+        # Nested containers keep their ancestors' indexes up to date as children are added and removed.
+        self._index: dict[str, list[Element]] = dict()
         self.add_children(*children or [])
 
         self.status_icon = status_icon
@@ -42,6 +47,10 @@ class Container(Element):
         return result
 
     def get_diff(self, other: dict[str, Any], remove: bool = True, retain_fields: Optional[list] = []) -> Optional[dict[str, Any]]:
+        if other is self._synced and not retain_fields:
+            # `other` is the state this container was last synced with, so only changed children need diffing.
+            return self._get_dirty_diff(other, remove=remove)
+
         res = super().get_diff(other, remove=remove, retain_fields=retain_fields) or {}
         # this will account for all the "normal" attributes, but not the children, since dicts aren't hashable
         # (ie. you can't do dict1 == dict2 to see if they're equal)
@@ -68,12 +77,72 @@ class Container(Element):
 
         return res
 
+    def _get_dirty_diff(self, other: dict[str, Any], remove: bool = True) -> Optional[dict[str, Any]]:
+        res = {}
+        if self._dirty:
+            # this container's own attributes have changed
+            res = super().get_diff(other, remove=remove) or {}
+            res.pop("children", None)
+
+        other_children = other.get("children", {})
+        children_diff = dict()
+        for name in self._dirty_children:
+            try:
+                child = self._children[name]
+            except KeyError:
+                # removed since the last sync
+                if remove and name in other_children:
+                    children_diff[name] = None
+                continue
+
+            try:
+                diff = child.get_diff(other_children[name], remove=remove)
+                if diff is not None:
+                    children_diff[name] = diff
+            except KeyError:
+                children_diff[name] = child.to_dict()
+
+        if children_diff:
+            res["children"] = children_diff
+
+        if len(res) == 0:
+            return None
+
+        return res
+
+    def _mark_synced(self, state: dict[str, Any]) -> bool:
+        children_state = state.get("children")
+        if not isinstance(children_state, dict):
+            children_state = {}
+
+        # if this is still the state we last synced with, only the dirty children can have changed
+        names = self._dirty_children if state is self._synced else list(self._children.keys())
+        unsynced = set()
+        for name in names:
+            try:
+                child = self._children[name]
+            except KeyError:
+                continue
+
+            child_state = children_state.get(name)
+            if not isinstance(child_state, dict) or not child._mark_synced(child_state):
+                unsynced.add(name)
+
+        self._dirty_children = unsynced
+        self._synced = state
+        self._dirty = False
+        return not unsynced
+
+    def _child_changed(self, name: str):
+        self._dirty_children.add(name)
+        self._propagate_dirty()
+
     @property
     def children(self):
         return list(self._children.values())
 
     def set_children(self, children: list[Element]):
-        self._children.clear()
+        self.clear_children()
         self.add_children(*children)
 
     def add_children(self, *children: Element):
@@ -89,8 +158,18 @@ class Container(Element):
             if not NAME_VALIDATOR.match(name):
                 raise RuntimeError(f"Invalid name '{name}' for element '{c}'. Valid characters include letters, numbers, and underscores.")
 
+            try:
+                replaced = self._children[name]
+            except KeyError:
+                pass
+            else:
+                self._remove_from_index(self._subtree_entries(name, replaced))
+                # detach it, so changes to it (or its children) don't touch this container's index or dirty set
+                replaced.parent = None
+
             self._children[name] = c
             c.parent = self
+            self._add_to_index(self._subtree_entries(name, c))
 
             if not c.position:
                 c.position = self._max_position
@@ -101,14 +180,58 @@ class Container(Element):
     def remove_children(self, *children: Element):
         for c in children:
             try:
-                del self._children[c.name]
+                removed = self._children.pop(c.name)
             except KeyError:
                 pass
+            else:
+                self._remove_from_index(self._subtree_entries(c.name, removed))
+                removed.parent = None
+                self._child_changed(c.name)
 
     def clear_children(self):
+        for name, c in self._children.items():
+            c.parent = None
+            self._child_changed(name)
+        self._remove_from_index([(name, e) for name, elements in self._index.items() for e in elements])
         self._children.clear()
 
+    @staticmethod
+    def _subtree_entries(name: str, element: Element) -> list[tuple[str, Element]]:
+        entries = [(name, element)]
+        if isinstance(element, Container):
+            entries.extend((n, e) for n, elements in element._index.items() for e in elements)
+        return entries
+
+    def _add_to_index(self, entries: Iterable[tuple[str, Element]]):
+        container = self
+        while isinstance(container, Container):
+            for name, element in entries:
+                container._index.setdefault(name, []).append(element)
+            container = getattr(container, "parent", None)
+
+    def _remove_from_index(self, entries: Iterable[tuple[str, Element]]):
+        container = self
+        while isinstance(container, Container):
+            for name, element in entries:
+                elements = container._index.get(name, [])
+                for i, e in enumerate(elements):
+                    if e is element:
+                        del elements[i]
+                        break
+                if not elements:
+                    container._index.pop(name, None)
+            container = getattr(container, "parent", None)
+
     def get_element(self, element_name: str) -> Optional[Element]:
+        try:
+            elements = self._index[element_name]
+        except KeyError:
+            return None
+
+        if len(elements) == 1:
+            return elements[0]
+
+        # the name is used more than once in this subtree, so search for the one that'd be found first
         try:
             return self._children[element_name]
         except KeyError:
@@ -63,9 +63,12 @@ class Variable(Element):
 
     def update(self, new_value: Any):
         if self.precision is not None and new_value is not None:
-            self._curr_val = round(new_value, self.precision)
-        else:
-            self._curr_val = new_value
+            new_value = round(new_value, self.precision)
+
+        if type(new_value) is type(self._curr_val) and new_value == self._curr_val:
+            return
+        self._curr_val = new_value
+        self.mark_dirty()
 
     def add_ranges(self, *range_val: Range):
         for r in range_val:
@@ -74,6 +77,7 @@ class Variable(Element):
                 self.ranges.append(r)
             elif isinstance(r, dict):
                 self.ranges.append(Range.from_dict(r))
+        self.mark_dirty()
 
 
 class NumericVariable(Variable):
@@ -1,3 +1,6 @@
+import copy
+
+
 
 
 ## A function to map a reading to a value in a range
@@ -61,4 +64,18 @@ def find_path_to_key(obj, key_to_find):
                 new_path = f"{path}.{key}" if path else key
                 stack.append({'current': current[key], 'path': new_path})
 
-    return None
\ No newline at end of file
+    return None
+
+def apply_diff(obj, diff, remove_none=True):
+    """Merge a published diff into a dict in-place, mirroring how channel aggregates are merged.
+
+    Nested dicts are merged recursively, and keys set to None are removed (if `remove_none` is set).
+    """
+    for key, value in diff.items():
+        if value is None and remove_none:
+            obj.pop(key, None)
+        elif isinstance(value, dict) and isinstance(obj.get(key), dict):
+            apply_diff(obj[key], value, remove_none=remove_none)
+        else:
+            obj[key] = copy.deepcopy(value)
+    return obj
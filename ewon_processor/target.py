@@ -5,14 +5,20 @@ from zoneinfo import ZoneInfo
 
 from pydoover.cloud.processor import ProcessorBase
 
+from pydatamailbox import TokenBucket
+
 from data_mailbox_client import DataMailboxClient, Ewon
 
-from ui import construct_ui
+from ui import construct_tag_elements, construct_ui
+
 
+DEFAULT_FETCH_TIME_BUDGET = 240
+DEFAULT_METADATA_CACHE_TTL = 6 * 60 * 60
 
 
 class target(ProcessorBase):
 
+    trace_loggers = ProcessorBase.trace_loggers + ("data_mailbox_client", )
 
     def setup(self):
 
@@ -21,8 +27,29 @@ class target(ProcessorBase):
         self.ui_cmds_channel = self.api.create_channel("ui_cmds", self.agent_id)
 
         # Construct the UI
-        self._ui_elements = construct_ui(self, self.get_ewon())
-        self.ui_manager.set_children(self._ui_elements)
+        if self.use_single_request_fetch():
+            ## build the UI from the first page of syncdata, rather than making a separate getewon request for the tags
+            ewon = self.get_ewon(fetch_metadata=False)
+            self._syncdata_pages = self.iterate_syncdata_pages()
+            with self.span("syncdata", page=1):
+                self._first_syncdata_page = next(self._syncdata_pages)
+        else:
+            ewon = self.get_ewon()
+
+        ## a UIManager kept from a previous warm invocation already has the element tree,
+        ## unless the UI settings have changed or there are tags it wasn't built with
+        ui_settings = self.get_ewon_ui_settings()
+        tag_names = {tag.tag_name for tag in ewon.tags}
+        if not (self.ui_manager_reused
+                and self.warm_state.get("ui_settings") == ui_settings
+                and tag_names <= self.warm_state.get("ui_tag_names", set())):
+            self._ui_elements = construct_ui(self, ewon)
+            self.ui_manager.set_children(self._ui_elements)
+            self.warm_state["ui_settings"] = ui_settings
+            self.warm_state["ui_tag_names"] = tag_names
+
+        # pull once, then track the published diffs locally rather than re-pulling before every frame is pushed
+        self.ui_manager.shadow_state = True
         self.ui_manager.pull()
 
 
@@ -36,14 +63,21 @@ class target(ProcessorBase):
         elif message_type == "FETCH":
             self.on_fetch()
 
-    def get_ewon(self):
+    def use_single_request_fetch(self):
+        ## syncdata carries the same tag metadata as getewon, so a fetch only needs the one Talk2M request
+        return self.package_config.get("message_type") == "FETCH" and self.package_config.get("single_request_fetch", True)
+
+    def get_ewon(self, fetch_metadata: bool = True):
         if hasattr(self, "_ewon"):
             return self._ewon
         
         ## Setup the ewon interface
         self._dm_client = DataMailboxClient(
+            session=self.get_session("talk2m"),
             token=self.get_dm_token(),
-            devid=self.get_developer_id()
+            devid=self.get_developer_id(),
+            metadata_cache_ttl=self.package_config.get("metadata_cache_ttl", DEFAULT_METADATA_CACHE_TTL),
+            rate_limiter=self.get_talk2m_rate_limiter(),
         )
         self._ewon = Ewon(
             client=self._dm_client,
@@ -51,7 +85,9 @@ class target(ProcessorBase):
             ewon_name=self.get_ewon_name(),
         )
         self._ewon.set_clock_tz(self.get_ewon_clock_tz())
-        self._ewon.update()
+        self.tracer.instrument_session(self._dm_client._dm.session)
+        if fetch_metadata:
+            self._ewon.update()
 
         return self._ewon
 
@@ -99,7 +135,24 @@ class target(ProcessorBase):
         # Run any downlink processing code here
         pass
 
-    def on_fetch(self):
+    def get_talk2m_rate_limiter(self):
+        ## e.g. {"rate": 2, "burst": 10, "budget": 500} - requests per second, burst size and an optional cap on total requests.
+        ## The rate is shared by every Ewon on the same Talk2M token within this container, and the budget is per invocation.
+        config = self.package_config.get("talk2m_rate_limit")
+        if not config:
+            return None
+        return TokenBucket.for_account(
+            self.get_dm_token(),
+            rate=config.get("rate", 1),
+            burst=config.get("burst", 1),
+            budget=config.get("budget"),
+        )
+
+    def get_fetch_time_budget(self):
+        ## seconds to spend draining syncdata pages before leaving the rest for the next fetch
+        return self.package_config.get("fetch_time_budget", DEFAULT_FETCH_TIME_BUDGET)
+
+    def iterate_syncdata_pages(self):
 
         ## Get the last transaction id, if any from ui_cmds
         last_transaction_id = None
@@ -111,27 +164,89 @@ class target(ProcessorBase):
 
         logging.info(f"Last transaction id: {last_transaction_id}")
 
-        ## Get the latest data from the ewon
-        self.get_ewon().last_transaction_id = last_transaction_id
-        self.get_ewon().syncdata(create_transaction=True)
-
-        ## Create the frames for the UI
-        self.get_ewon().create_frames()
-
-        ## For each frame, publish a timestamped message to the ui_state channel
-        for frame in self.get_ewon().tag_frames:
-
-            timestamp = frame.timestamp
-            for tag in frame.tag_values:
-                self.ui_manager.update_variable(tag.tag_name, tag.value)
-            
-            logging.info(f"Pushing record log for timestamp: {timestamp}, with tz {timestamp.tzinfo}")
-            self.ui_manager.push(record_log=True, timestamp=timestamp, even_if_empty=True)
-
-        ## if success, get the latest transaction id and update the ui_cmds channel
-        if self.get_ewon().last_transaction_id is not None:
-            self.ui_cmds_channel.publish({
-                "cmds": {
-                    "last_ewon_transaction_id": self.get_ewon().last_transaction_id
-                }
-            })
+        ewon = self.get_ewon()
+        ewon.last_transaction_id = last_transaction_id
+        return ewon.iterate_syncdata(stream=True)
+
+    def on_fetch(self):
+        start_time = time.time()
+        time_budget = self.get_fetch_time_budget()
+
+        ## if the UI was built from syncdata, the first page has already been fetched (and timed) in setup
+        first_page = getattr(self, "_first_syncdata_page", None)
+        self._first_syncdata_page = None
+        pages = getattr(self, "_syncdata_pages", None) or self.iterate_syncdata_pages()
+
+        ## syncdata pages only have the tags with new data, so in single request mode the UI is missing any tag that
+        ## was quiet for this fetch. Pruning, even on the last page, would remove those tags' elements (and their
+        ## current values) until they next have data. Elements for tags removed from the ewon are pruned instead by
+        ## DEPLOY, which builds the full UI from getewon, or by setting single_request_fetch to false.
+        should_remove = not self.use_single_request_fetch()
+
+        ## Drain every page of data from the ewon, checkpointing after each one
+        ## so a timeout part way through loses at most one page of work.
+        page_num = 0
+        while True:
+            if first_page is not None:
+                page, first_page = first_page, None
+            else:
+                ## the syncdata span covers both the download and decoding of each page, since they're streamed together
+                with self.span("syncdata", page=page_num + 1):
+                    page = next(pages, None)
+            if page is None:
+                break
+            page_num += 1
+
+            ## a page only has the tags with new data, so there may be tags the UI wasn't built with
+            self.add_new_tag_elements(page)
+
+            ## Create the frames for the UI
+            with self.span("frame"):
+                if page.tags:
+                    page.create_frames()
+
+            with self.span("collect"):
+                frames = [
+                    (frame.timestamp, {tag.tag_name: tag.value for tag in frame.tag_values})
+                    for frame in page.tag_frames
+                ]
+
+            ## Publish a timestamped message to the ui_state channel for each frame, batched into as few requests as possible
+            with self.span("push", frames=len(frames)):
+                logging.info(f"Pushing record logs for {len(frames)} frames from page {page_num}")
+                self.ui_manager.push_many(frames, record_log=True, should_remove=should_remove, even_if_empty=True)
+
+                ## if success, get the latest transaction id and update the ui_cmds channel
+                self.checkpoint_transaction_id(page.last_transaction_id)
+
+            ## stop here rather than asking for another page, which would only end the iteration
+            if not page.more_data_available:
+                break
+
+            if time.time() - start_time > time_budget:
+                logging.warning(f"Fetch time budget of {time_budget}s used up after {page_num} pages, leaving the rest for the next fetch.")
+                break
+
+    def add_new_tag_elements(self, ewon):
+        ## warm_state is kept per invocation when warm reuse is off, so this always has the tags the UI was built with
+        ui_tag_names = self.warm_state.setdefault("ui_tag_names", set())
+        new_tags = [tag for tag in ewon.tags if tag.tag_name not in ui_tag_names]
+        if not new_tags:
+            return
+
+        ## excluded tags are recorded too, so they aren't looked at again
+        ui_tag_names.update(tag.tag_name for tag in new_tags)
+        elements = construct_tag_elements(self, new_tags)
+        if elements:
+            logging.info(f"Adding UI elements for {len(elements)} new tags")
+            self.ui_manager.add_children(*elements)
+
+    def checkpoint_transaction_id(self, transaction_id):
+        if transaction_id is None:
+            return
+
+        self.ui_cmds_channel.publish({
+            "cmds": {
+                "last_ewon_transaction_id": transaction_id
+            }
+        })
@@ -30,11 +30,36 @@ def tag_to_element(settings, tag):
     return None
 
 
+def construct_tag_elements(processor, tags):
+    ## Elements for tags that weren't known when the UI was built (eg. they first appear on a later syncdata page),
+    ## following the same settings as construct_ui
+
+    ewon_ui_settings = processor.get_ewon_ui_settings() or {}
+    tag_settings = {ui_tag["tag_name"]: ui_tag for ui_tag in ewon_ui_settings.get("tags", [])}
+    exclude_tags = set(ewon_ui_settings.get("exclude_tags", []))
+    auto_include = ewon_ui_settings.get("auto_include", True) == True
+
+    ui_elems = []
+    for tag in tags:
+        if tag.tag_name in tag_settings:
+            element = tag_to_element(tag_settings[tag.tag_name], tag)
+        elif tag.tag_name in exclude_tags or not auto_include:
+            continue
+        else:
+            element = tag_to_element({}, tag)
+
+        if element:
+            ui_elems.append(element)
+
+    return ui_elems
+
+
 def construct_ui(processor, ewon):
 
     ewon_ui_settings = processor.get_ewon_ui_settings()
 
-    ewon_tags = ewon.tags
+    ## copy, so removing tags below doesn't change the ewon's own tag list
+    ewon_tags = list(ewon.tags)
 
     ui_elems = []
 
@@ -56,6 +81,9 @@ def construct_ui(processor, ewon):
 
                 ## Find the corresponding tag
                 tag = ewon.get_tag(ui_tag["tag_name"])
+                if tag is None:
+                    ## the tag list may come from syncdata, which only has tags with new data
+                    continue
                 ## remove it from the list remaining
                 ewon_tags.remove(tag)
 
@@ -69,7 +97,8 @@ def construct_ui(processor, ewon):
                 ## Find the corresponding tag
                 tag = ewon.get_tag(tag)
                 ## remove it from the list remaining
-                ewon_tags.remove(tag)
+                if tag is not None:
+                    ewon_tags.remove(tag)
 
     if not "auto_include" in ewon_ui_settings or ewon_ui_settings["auto_include"] == True:
         ## Add any remaining tags